@@ -0,0 +1,5 @@
+from traveltogetherapp.asgi import create_asgi_app
+
+
+# Async entry point, e.g.: uvicorn asgi:application --host 0.0.0.0 --port 5000
+application = create_asgi_app()
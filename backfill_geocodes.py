@@ -0,0 +1,45 @@
+"""
+Backfill coordinates and geohashes for existing trip proposals using the
+offline gazetteer (config.GAZETTEER_PATH). Safe to re-run, e.g. after the
+gazetteer file has been updated.
+
+Usage: python backfill_geocodes.py [batch_size]
+"""
+import sys
+
+from app import app
+from traveltogetherapp.models import db, TripProposal
+from traveltogetherapp.geocoding import apply_geocodes, get_geocoder
+
+BATCH_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+with app.app_context():
+    geocoder = get_geocoder()
+    if not geocoder.places:
+        print(f"Gazetteer is empty or missing: {app.config.get('GAZETTEER_PATH')}")
+        sys.exit(1)
+
+    last_id = 0
+    updated = 0
+    resolved = 0
+    while True:
+        # Keyset pagination keeps memory bounded and avoids OFFSET scans
+        query = db.select(TripProposal).where(
+            TripProposal.id > last_id
+        ).order_by(TripProposal.id).limit(BATCH_SIZE)
+        batch = db.session.execute(query).scalars().all()
+        if not batch:
+            break
+
+        for proposal in batch:
+            apply_geocodes(proposal, geocoder)
+            if proposal.departure_geohash or proposal.destination_geohash:
+                resolved += 1
+        last_id = batch[-1].id
+        updated += len(batch)
+
+        db.session.commit()
+        db.session.expunge_all()
+        print(f"Processed {updated} proposals ({resolved} with coordinates)")
+
+    print("\nBackfill completed successfully!")
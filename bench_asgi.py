@@ -0,0 +1,133 @@
+"""
+Benchmark: concurrent-connection capacity of the WSGI and ASGI entry points.
+
+Both modes serve the proposal detail page from a throwaway SQLite database.
+A fixed delay is added to every SQL statement to model the network round-trip
+to a remote MySQL server: in WSGI mode it blocks the worker thread (as a sync
+driver does), in ASGI mode it is awaited (as aiomysql does).
+
+WSGI mode runs with a fixed thread pool (like `gunicorn --threads`); ASGI mode
+runs all requests on one event loop.
+
+Usage: python bench_asgi.py [latency_ms] [wsgi_threads] [requests]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+LATENCY = (float(sys.argv[1]) if len(sys.argv) > 1 else 20.0) / 1000
+WSGI_THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+REQUESTS = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+CONCURRENCY = (8, 32, 128)
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+config.Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+# Flask-SQLAlchemy creates the engines in create_app(), so pool sizes go in here
+config.Config.SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": WSGI_THREADS}
+config.Config.ASYNC_POOL_SIZE = max(CONCURRENCY)
+config.Config.ASYNC_MAX_OVERFLOW = 0
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.util import await_only  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from traveltogetherapp import create_app  # noqa: E402
+from traveltogetherapp.asgi import create_asgi_app  # noqa: E402
+from traveltogetherapp.models import db, User, TripProposal, Participation, Message  # noqa: E402
+
+app = create_app()
+
+with app.app_context():
+    db.create_all()
+    user = User(email="bench@example.com", password=generate_password_hash("Password"))
+    db.session.add(user)
+    db.session.flush()
+    proposal = TripProposal(title="Bench trip", creator_id=user.id, max_participants=10)
+    db.session.add(proposal)
+    db.session.flush()
+    db.session.add(Participation(user_id=user.id, proposal_id=proposal.id, can_edit=True))
+    db.session.add_all([Message(content=f"Message {i}", user_id=user.id, proposal_id=proposal.id) for i in range(20)])
+    db.session.commit()
+    proposal_id = proposal.id
+
+    @event.listens_for(db.engine, "before_cursor_execute")
+    def sync_latency(*args):
+        time.sleep(LATENCY)
+
+path = f"/proposal/{proposal_id}"
+
+
+def report(mode, concurrency, durations, elapsed):
+    durations.sort()
+    p95 = durations[int(len(durations) * 0.95) - 1]
+    print(f"{mode:>5} c={concurrency:<4} {len(durations) / elapsed:8.0f} req/s   "
+          f"p50 {statistics.median(durations) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+
+
+def bench_wsgi(concurrency):
+    clients = []
+    for _ in range(concurrency):
+        client = app.test_client()
+        client.post("/login", data={"email": "bench@example.com", "password": "Password"})
+        clients.append(client)
+
+    def one(i, submitted):
+        assert clients[i % concurrency].get(path).status_code == 200
+        return time.perf_counter() - submitted
+
+    # `concurrency` clients keep one request in flight each; requests beyond the
+    # thread count wait in the server queue, which counts towards their latency
+    started = time.perf_counter()
+    durations = []
+    with ThreadPoolExecutor(max_workers=WSGI_THREADS) as pool:
+        for offset in range(0, REQUESTS, concurrency):
+            wave = [pool.submit(one, i, time.perf_counter()) for i in range(offset, min(offset + concurrency, REQUESTS))]
+            durations += [f.result() for f in wave]
+    report("wsgi", concurrency, durations, time.perf_counter() - started)
+
+
+async def bench_asgi(asgi, concurrency):
+    transport = httpx.ASGITransport(app=asgi)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", data={"email": "bench@example.com", "password": "Password"})
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                assert response.status_code == 200
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        durations = await asyncio.gather(*[one() for _ in range(REQUESTS)])
+    report("asgi", concurrency, list(durations), time.perf_counter() - started)
+
+
+async def run_asgi():
+    asgi = create_asgi_app(app)
+    from traveltogetherapp.aio import AsyncDatabase
+    asgi.db = AsyncDatabase(app)
+
+    @event.listens_for(asgi.db.engine.sync_engine, "before_cursor_execute")
+    def async_latency(*args):
+        await_only(asyncio.sleep(LATENCY))
+
+    for concurrency in CONCURRENCY:
+        await bench_asgi(asgi, concurrency)
+    await asgi.db.dispose()
+
+
+print(f"{REQUESTS} requests of GET {path}, {LATENCY * 1000:.0f} ms per statement, "
+      f"{WSGI_THREADS} WSGI threads")
+for concurrency in CONCURRENCY:
+    bench_wsgi(concurrency)
+asyncio.run(run_asgi())
+os.remove(db_path)
@@ -0,0 +1,88 @@
+"""
+Benchmark for near-duplicate detection on new proposals.
+
+Builds a throwaway SQLite database with N open proposals (random place names,
+titles and dates), builds the duplicate index and times find_duplicates() for
+variations of existing proposals.
+
+Usage: python bench_duplicates.py [proposals] [places]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import config
+
+N_PROPOSALS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+N_PLACES = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+REPEAT = 500
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+config.Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+config.Config.SLOW_QUERY_LOG_ENABLED = False
+
+from traveltogetherapp import create_app  # noqa: E402
+from traveltogetherapp.models import db  # noqa: E402
+from traveltogetherapp.duplicates import build_duplicate_index, find_duplicates, get_duplicate_index  # noqa: E402
+
+app = create_app()
+rng = random.Random(42)
+countries = ["France", "Norway", "Spain", "Italy", "Japan", "Peru"]
+places = [
+    "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))).title() + ", " + rng.choice(countries)
+    for _ in range(N_PLACES)
+]
+words = ["hiking", "trip", "weekend", "summer", "ski", "food", "tour", "beach", "festival", "city", "break"]
+
+with app.app_context():
+    db.create_all()
+    conn = db.session.connection()
+    conn.execute(db.text("INSERT INTO user (id, email, password) VALUES (1, 'bench@example.com', 'x')"))
+
+    print(f"Inserting {N_PROPOSALS:,} open proposals...")
+    rows = []
+    for i in range(1, N_PROPOSALS + 1):
+        start = date.today() + timedelta(days=rng.randint(0, 365))
+        rows.append({
+            "id": i,
+            "title": f"{' '.join(rng.sample(words, 3))} in {rng.choice(places).split(',')[0]}",
+            "destination": rng.choice(places),
+            "start": start,
+            "end": start + timedelta(days=rng.randint(2, 10)),
+        })
+    conn.execute(
+        db.text("INSERT INTO trip_proposal (id, title, destination, start_date, end_date, creator_id, status, "
+                "message_count, version) VALUES (:id, :title, :destination, :start, :end, 1, 'open', 0, 1)"),
+        rows,
+    )
+    db.session.commit()
+
+    started = time.perf_counter()
+    index = build_duplicate_index()
+    print(f"Index built in {time.perf_counter() - started:.1f} s ({len(index):,} proposals)")
+    holder = app.extensions["duplicate_index"]
+    holder.index, holder.built_at = index, time.monotonic()
+    get_duplicate_index()
+
+    queries = []
+    for row in rng.sample(rows, REPEAT):
+        place = row["destination"].split(",")[0]
+        shift = timedelta(days=rng.randint(-3, 3))
+        queries.append((f"Trip to {place}", place, row["start"] + shift, row["end"] + shift, row["id"]))
+
+    timings = []
+    found = 0
+    for title, destination, start, end, original in queries:
+        t = time.perf_counter()
+        matches = find_duplicates(title, destination, start, end)
+        timings.append(time.perf_counter() - t)
+        found += any(p.id == original for p, _ in matches)
+
+    timings.sort()
+    print(f"find_duplicates: median {timings[len(timings) // 2] * 1000:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms, "
+          f"original found in {found / len(queries):.0%} of {len(queries)} lookups")
@@ -0,0 +1,73 @@
+"""
+Benchmark for unread message counters.
+
+Builds a throwaway SQLite database with N messages spread over a number of
+trips, then times unread_counts() for one user with both strategies (read
+cursor + indexed aggregate, and incrementally maintained counters).
+
+Usage: python bench_unread.py [messages] [trips] [trips_per_user]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import config
+
+N_MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+N_TRIPS = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+TRIPS_PER_USER = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+REPEAT = 50
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+config.Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+
+from traveltogetherapp import create_app  # noqa: E402
+from traveltogetherapp.models import db  # noqa: E402
+from traveltogetherapp.unread import unread_counts  # noqa: E402
+
+app = create_app()
+
+with app.app_context():
+    db.create_all()
+    conn = db.session.connection()
+    conn.execute(db.text("INSERT INTO user (id, email, password) VALUES (1, 'bench@example.com', 'x')"))
+    conn.execute(
+        db.text("INSERT INTO trip_proposal (id, title, creator_id, status, message_count) "
+                "VALUES (:id, 'Trip', 1, 'open', :n)"),
+        [{"id": i, "n": N_MESSAGES // N_TRIPS} for i in range(1, N_TRIPS + 1)],
+    )
+
+    print(f"Inserting {N_MESSAGES:,} messages over {N_TRIPS:,} trips...")
+    started = time.perf_counter()
+    batch = []
+    for i in range(1, N_MESSAGES + 1):
+        batch.append({"id": i, "p": (i % N_TRIPS) + 1})
+        if len(batch) == 50_000:
+            conn.execute(db.text("INSERT INTO message (id, content, user_id, proposal_id) VALUES (:id, 'hi', 1, :p)"), batch)
+            batch = []
+    if batch:
+        conn.execute(db.text("INSERT INTO message (id, content, user_id, proposal_id) VALUES (:id, 'hi', 1, :p)"), batch)
+    print(f"  done in {time.perf_counter() - started:.1f} s")
+
+    # The user has read roughly half of each of their trips
+    conn.execute(
+        db.text("INSERT INTO participation (user_id, proposal_id, can_edit, last_read_message_id, read_message_count) "
+                "VALUES (1, :p, 1, :cursor, :read)"),
+        [{"p": p, "cursor": N_MESSAGES // 2, "read": N_MESSAGES // N_TRIPS // 2} for p in range(1, TRIPS_PER_USER + 1)],
+    )
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+
+    for use_counters in (False, True):
+        app.config["UNREAD_USE_COUNTERS"] = use_counters
+        counts = unread_counts(1)
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            unread_counts(1)
+        elapsed = (time.perf_counter() - started) / REPEAT
+        label = "counters" if use_counters else "cursor + aggregate"
+        print(f"{label:>20}: {elapsed * 1000:8.2f} ms per page view "
+              f"({len(counts)} trips, {sum(counts.values()):,} unread)")
+
+os.remove(db_path)
@@ -0,0 +1,81 @@
+"""
+Query budget check for the proposal detail page.
+
+Builds a throwaway SQLite database with one trip (participants x messages),
+renders /proposal/<id> through the test client and counts the SQL statements
+issued. Exits with status 1 if the page needs more than QUERY_BUDGET
+statements, e.g. because a template started touching a lazy relationship.
+
+Usage: python check_query_budget.py [participants] [messages]
+"""
+import os
+import sys
+import tempfile
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+import config
+
+N_PARTICIPANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+N_MESSAGES = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+# current user, proposal, roster + users, messages + authors, meetups, read cursor update
+QUERY_BUDGET = 6
+
+db_path = os.path.join(tempfile.mkdtemp(), "budget.db")
+config.Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+config.Config.JOBS_ENABLED = False
+config.Config.SLOW_QUERY_LOG_ENABLED = False
+
+from traveltogetherapp import create_app  # noqa: E402
+from traveltogetherapp.models import db  # noqa: E402
+
+app = create_app()
+
+with app.app_context():
+    db.create_all()
+    conn = db.session.connection()
+    conn.execute(
+        db.text("INSERT INTO user (id, email, password) VALUES (:id, :email, :pw)"),
+        [{"id": i, "email": f"user{i}@example.com", "pw": generate_password_hash("Password")}
+         for i in range(1, N_PARTICIPANTS + 1)],
+    )
+    conn.execute(db.text(
+        "INSERT INTO trip_proposal (id, title, creator_id, status, message_count, version) "
+        "VALUES (1, 'Trip', 1, 'open', :n, 1)"
+    ), {"n": N_MESSAGES})
+    conn.execute(
+        db.text("INSERT INTO participation (user_id, proposal_id, can_edit, last_read_message_id, read_message_count) "
+                "VALUES (:u, 1, :edit, 0, 0)"),
+        [{"u": i, "edit": i == 1} for i in range(1, N_PARTICIPANTS + 1)],
+    )
+    conn.execute(
+        db.text("INSERT INTO message (id, content, user_id, proposal_id, timestamp) "
+                "VALUES (:id, 'hi', :u, 1, CURRENT_TIMESTAMP)"),
+        [{"id": i, "u": (i % N_PARTICIPANTS) + 1} for i in range(1, N_MESSAGES + 1)],
+    )
+    conn.execute(db.text("INSERT INTO meetup (location, proposal_id, creator_id) VALUES ('Station', 1, 1)"))
+    db.session.commit()
+
+    statements = []
+
+    @event.listens_for(db.engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+client = app.test_client()
+client.post("/login", data={"email": "user1@example.com", "password": "Password"})
+
+statements.clear()
+response = client.get("/proposal/1")
+if response.status_code != 200:
+    print(f"Unexpected status {response.status_code}")
+    sys.exit(1)
+
+print(f"{len(statements)} queries for {N_PARTICIPANTS} participants and {N_MESSAGES} messages (budget {QUERY_BUDGET})")
+if len(statements) > QUERY_BUDGET:
+    for statement in statements:
+        print("  " + " ".join(statement.split())[-140:])
+    sys.exit(1)
+print("OK")
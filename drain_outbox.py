@@ -0,0 +1,19 @@
+"""
+Deliver queued notification digests from the outbox to an SMTP server.
+
+For local development, start an SMTP stand-in first, e.g.:
+    python -m aiosmtpd -n -l localhost:1025
+
+Usage: python drain_outbox.py [host] [port]
+"""
+import sys
+
+from app import app
+from traveltogetherapp.notifications import get_outbox, smtp_deliver
+
+host = sys.argv[1] if len(sys.argv) > 1 else "localhost"
+port = int(sys.argv[2]) if len(sys.argv) > 2 else 1025
+
+with app.app_context():
+    sent = get_outbox().drain(smtp_deliver(host, port))
+    print(f"Delivered {sent} digest(s) to {host}:{port}")
@@ -0,0 +1,31 @@
+"""
+Migration script to add geocoding columns to trip_proposal table:
+- departure_lat / departure_lon / departure_geohash
+- destination_lat / destination_lon / destination_geohash
+- Indexes on the geohash columns (used for radius queries)
+
+For MariaDB/MySQL database. Run backfill_geocodes.py afterwards to fill in existing rows.
+"""
+
+from app import app
+from traveltogetherapp.models import db
+
+with app.app_context():
+    for prefix in ("departure", "destination"):
+        for column, sql_type in (("lat", "DOUBLE"), ("lon", "DOUBLE"), ("geohash", "VARCHAR(12)")):
+            try:
+                db.session.execute(db.text(f"ALTER TABLE trip_proposal ADD COLUMN {prefix}_{column} {sql_type}"))
+                print(f"Added {prefix}_{column} column")
+            except Exception as e:
+                print(f"{prefix}_{column}: {e}")
+
+        try:
+            db.session.execute(db.text(
+                f"CREATE INDEX ix_trip_proposal_{prefix}_geohash ON trip_proposal ({prefix}_geohash)"
+            ))
+            print(f"Added index on {prefix}_geohash")
+        except Exception as e:
+            print(f"ix_trip_proposal_{prefix}_geohash: {e}")
+
+    db.session.commit()
+    print("\nMigration completed successfully!")
@@ -0,0 +1,21 @@
+"""
+Migration script for bulk proposal administration:
+- user.is_moderator (moderators may bulk finalize / cancel / close / reopen any proposal)
+
+Grant the role with e.g.: UPDATE user SET is_moderator = 1 WHERE email = '...';
+
+For MariaDB/MySQL database
+"""
+
+from app import app
+from traveltogetherapp.models import db
+
+with app.app_context():
+    try:
+        db.session.execute(db.text("ALTER TABLE user ADD COLUMN is_moderator BOOLEAN NOT NULL DEFAULT 0"))
+        db.session.commit()
+        print("Added is_moderator")
+    except Exception as e:
+        print(f"is_moderator: {e}")
+
+    print("\nMigration completed successfully!")
@@ -0,0 +1,19 @@
+"""
+Migration script for optimistic concurrency on proposal edits:
+- trip_proposal.version (SQLAlchemy version counter, checked on every ORM UPDATE)
+
+For MariaDB/MySQL database
+"""
+
+from app import app
+from traveltogetherapp.models import db
+
+with app.app_context():
+    try:
+        db.session.execute(db.text("ALTER TABLE trip_proposal ADD COLUMN version INT NOT NULL DEFAULT 1"))
+        db.session.commit()
+        print("Added version")
+    except Exception as e:
+        print(f"version: {e}")
+
+    print("\nMigration completed successfully!")
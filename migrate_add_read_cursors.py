@@ -0,0 +1,45 @@
+"""
+Migration script for unread message counters:
+- participation.last_read_message_id / read_message_count (read cursor)
+- trip_proposal.message_count (incrementally maintained counter)
+- Indexes on message (proposal_id, id) and participation (user_id)
+
+Existing participants start with everything marked as read.
+
+For MariaDB/MySQL database
+"""
+
+from app import app
+from traveltogetherapp.models import db
+
+statements = [
+    ("last_read_message_id", "ALTER TABLE participation ADD COLUMN last_read_message_id INT NOT NULL DEFAULT 0"),
+    ("read_message_count", "ALTER TABLE participation ADD COLUMN read_message_count INT NOT NULL DEFAULT 0"),
+    ("message_count", "ALTER TABLE trip_proposal ADD COLUMN message_count INT NOT NULL DEFAULT 0"),
+    ("ix_message_proposal_id_id", "CREATE INDEX ix_message_proposal_id_id ON message (proposal_id, id)"),
+    ("ix_participation_user_id", "CREATE INDEX ix_participation_user_id ON participation (user_id)"),
+]
+
+with app.app_context():
+    for name, sql in statements:
+        try:
+            db.session.execute(db.text(sql))
+            print(f"Added {name}")
+        except Exception as e:
+            print(f"{name}: {e}")
+
+    db.session.execute(db.text(
+        "UPDATE trip_proposal SET message_count = "
+        "(SELECT COUNT(*) FROM message WHERE message.proposal_id = trip_proposal.id)"
+    ))
+    print("Backfilled message_count")
+
+    db.session.execute(db.text(
+        "UPDATE participation SET "
+        "last_read_message_id = COALESCE((SELECT MAX(id) FROM message WHERE message.proposal_id = participation.proposal_id), 0), "
+        "read_message_count = (SELECT message_count FROM trip_proposal WHERE trip_proposal.id = participation.proposal_id)"
+    ))
+    print("Initialized read cursors")
+
+    db.session.commit()
+    print("\nMigration completed successfully!")
@@ -32,16 +32,57 @@ def create_app():
     # Read configuration script
     app.config.from_object("config.Config")
 
+    # Trust X-Forwarded-For / -Proto from this many reverse proxies
+    if app.config.get("PROXY_FIX_X_FOR"):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config["PROXY_FIX_X_FOR"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
     # Connect database and login manager
     db.init_app(app)
     login_manager.init_app(app)
 
+    # Embedded SQLite mode: WAL, busy timeout and cache pragmas on every connection
+    from .sqlitedb import is_sqlite, init_sqlite
+    if is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        with app.app_context():
+            init_sqlite(app, db.engine)
+
     # Register blueprint modules
     from .auth import auth_bp
     from .proposals import proposals_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(proposals_bp)
 
+    # Throttle writes and joins (RATE_LIMITS)
+    if app.config.get("RATE_LIMIT_ENABLED"):
+        from .ratelimit import init_rate_limits
+        if app.config.get("RATE_LIMIT_STORE") == "sqlite":
+            os.makedirs(os.path.dirname(app.config["RATE_LIMIT_STORE_PATH"]), exist_ok=True)
+        init_rate_limits(app)
+
+    # Log statements slower than SLOW_QUERY_THRESHOLD_MS
+    if app.config.get("SLOW_QUERY_LOG_ENABLED"):
+        from .slowlog import init_slow_query_log
+        os.makedirs(os.path.dirname(app.config["SLOW_QUERY_LOG_PATH"]), exist_ok=True)
+        with app.app_context():
+            init_slow_query_log(app, db.engine)
+
+    # Build the place-name autocomplete and near-duplicate indexes
+    from .autocomplete import warm_autocomplete
+    from .duplicates import warm_duplicate_index
+    warm_autocomplete(app)
+    warm_duplicate_index(app)
+
+    # Register CLI commands (flask --app app <command>)
+    from .cli import register_cli
+    register_cli(app)
+
+    # Start background jobs (scheduled status transitions etc.)
+    if app.config.get("JOBS_ENABLED"):
+        from .jobs import start_job_runner
+        start_job_runner(app)
+
     # User gets sendt to index page/standard route
     @app.route("/")
     def index():
@@ -0,0 +1,51 @@
+"""
+Async database access for the ASGI entry point.
+
+Uses the same models and query builders (queries.py) as the sync app; only the
+driver differs: aiomysql for MySQL/MariaDB and aiosqlite for local SQLite.
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+# Sync driver -> async driver
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_uri(uri: str) -> str:
+    """Translate a sync SQLAlchemy URI to the equivalent async driver."""
+    url = make_url(uri)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+class AsyncDatabase:
+    """Async engine and session factory built from the Flask app configuration."""
+
+    def __init__(self, app):
+        uri = app.config.get("ASYNC_SQLALCHEMY_DATABASE_URI") or async_database_uri(
+            app.config["SQLALCHEMY_DATABASE_URI"]
+        )
+        options = {
+            "pool_size": app.config.get("ASYNC_POOL_SIZE", 20),
+            "max_overflow": app.config.get("ASYNC_MAX_OVERFLOW", 10),
+        }
+        if not uri.startswith("sqlite"):
+            options.update(pool_recycle=3600, pool_pre_ping=True)
+        self.engine = create_async_engine(uri, **options)
+        if uri.startswith("sqlite"):
+            from .sqlitedb import attach
+            attach(self.engine.sync_engine, app.config)
+        if app.config.get("SLOW_QUERY_LOG_ENABLED"):
+            # Timing only: EXPLAIN needs a sync DBAPI cursor
+            from .slowlog import attach
+            attach(self.engine.sync_engine, app.config.get("SLOW_QUERY_THRESHOLD_MS", 200), explain=False)
+        self.session = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
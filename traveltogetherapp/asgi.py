@@ -0,0 +1,217 @@
+"""
+ASGI entry point.
+
+The read-heavy proposal pages (discovery list, proposal detail) and the message
+stream are served natively async using an AsyncSession (see aio.py), so a slow
+database round-trip does not hold a worker thread. They use the same query
+builders, templates and session cookie as the Flask app. Every other request,
+and every non-happy path of the async routes (not logged in, not found, not a
+participant), is passed to the regular Flask WSGI app so behaviour stays identical.
+
+Run with e.g.: uvicorn asgi:application
+"""
+import re
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import g, render_template
+from itsdangerous import BadSignature
+from sqlalchemy.orm import selectinload
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_cookie
+
+from .aio import AsyncDatabase
+from .facets import parse_filters
+from .models import User, TripProposal, ProposalStatus
+from .queries import (
+    discovery_query,
+    participation_query,
+    user_participations_query,
+    meetups_query,
+    proposal_detail_query,
+    detail_messages_query,
+    message_stream_query,
+    message_ndjson,
+)
+from .unread import unread_query, advance_read_cursor
+
+STREAM_CHUNK_ROWS = 500
+
+
+class AsyncApp:
+    """ASGI application serving selected GET routes async and the rest through Flask."""
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WsgiToAsgi(app)
+        self.db = None
+        self.routes = [
+            (re.compile(r"/proposals"), self.list_proposals),
+            (re.compile(r"/proposal/(?P<proposal_id>\d+)"), self.proposal_detail),
+            (re.compile(r"/proposal/(?P<proposal_id>\d+)/messages\.ndjson"), self.stream_messages),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(scope["path"])
+                if match:
+                    if self.db is None:
+                        self.db = AsyncDatabase(self.app)
+                    user_id = self._session_user_id(scope)
+                    if user_id is not None:
+                        handled = await handler(scope, send, user_id, **match.groupdict())
+                        if handled:
+                            return
+                    break
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.db = AsyncDatabase(self.app)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.db is not None:
+                    await self.db.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- Helpers ---------------------------------------------------------------
+
+    def _session_user_id(self, scope) -> int | None:
+        """Read the logged-in user id from the Flask session cookie."""
+        cookies = parse_cookie(_header(scope, b"cookie") or "")
+        raw = cookies.get(self.app.config.get("SESSION_COOKIE_NAME", "session"))
+        serializer = self.app.session_interface.get_signing_serializer(self.app)
+        if not raw or serializer is None:
+            return None
+        try:
+            data = serializer.loads(raw, max_age=int(self.app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return None
+        user_id = data.get("_user_id")
+        return int(user_id) if user_id is not None else None
+
+    def _render(self, scope, user: User, template: str, **context):
+        """Render a template inside a Flask request context built from the ASGI scope."""
+        host = _header(scope, b"host") or "localhost"
+        headers = [
+            (k.decode("latin-1"), v.decode("latin-1"))
+            for k, v in scope["headers"] if k.lower() != b"host"
+        ]
+        with self.app.test_request_context(
+            path=scope["path"],
+            query_string=scope.get("query_string", b""),
+            headers=headers,
+            base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}",
+        ):
+            g._login_user = user  # picked up by flask_login.current_user
+            rv = self.app.preprocess_request()
+            if rv is None:
+                rv = render_template(template, **context)
+            response = self.app.make_response(rv)
+            # Saves the session cookie (e.g. flashes consumed by the template)
+            response = self.app.process_response(response)
+        return response
+
+    async def _send_response(self, send, response) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()],
+        })
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    # --- Routes (return False to fall back to the WSGI app) --------------------
+
+    async def list_proposals(self, scope, send, user_id: int) -> bool:
+        args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        filters = parse_filters(args)
+        use_counters = self.app.config.get("UNREAD_USE_COUNTERS", False)
+
+        async with self.db.session() as s:
+            user = await s.get(User, user_id)
+            if user is None:
+                return False
+            query = discovery_query(filters).options(selectinload(TripProposal.participations))
+            proposals = (await s.execute(query)).scalars().all()
+            parts = (await s.execute(user_participations_query(user_id, [p.id for p in proposals]))).scalars()
+            by_proposal = {part.proposal_id: part for part in parts}
+            unread = {pid: n for pid, n in await s.execute(unread_query(user_id, use_counters)) if n and n > 0}
+
+        for p in proposals:
+            p.participation = by_proposal.get(p.id)
+        response = self._render(scope, user, "proposals_list.html", proposals=proposals, unread=unread)
+        await self._send_response(send, response)
+        return True
+
+    async def proposal_detail(self, scope, send, user_id: int, proposal_id: str) -> bool:
+        proposal_id = int(proposal_id)
+        async with self.db.session() as s:
+            user = await s.get(User, user_id)
+            proposal = (await s.execute(proposal_detail_query(proposal_id))).scalar_one_or_none()
+            if user is None or proposal is None:
+                return False
+            participation = next((p for p in proposal.participations if p.user_id == user_id), None)
+            if participation is None:
+                return False
+
+            messages = (await s.execute(detail_messages_query(proposal_id))).scalars().all()
+            meetups = (await s.execute(meetups_query(proposal_id))).scalars().all()
+
+            if advance_read_cursor(participation, messages):
+                await s.commit()
+
+        response = self._render(
+            scope, user, "proposal_detail.html",
+            proposal=proposal,
+            messages=messages,
+            meetups=meetups,
+            participation=participation,
+            ProposalStatus=ProposalStatus,
+        )
+        await self._send_response(send, response)
+        return True
+
+    async def stream_messages(self, scope, send, user_id: int, proposal_id: str) -> bool:
+        proposal_id = int(proposal_id)
+        async with self.db.session() as s:
+            participation = (await s.execute(participation_query(user_id, proposal_id))).scalar_one_or_none()
+            if participation is None:
+                return False
+
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            })
+            result = await s.stream(message_stream_query(proposal_id))
+            chunk = []
+            async for row in result:
+                chunk.append(message_ndjson(row))
+                if len(chunk) >= STREAM_CHUNK_ROWS:
+                    await send({"type": "http.response.body", "body": "".join(chunk).encode(), "more_body": True})
+                    chunk = []
+            await send({"type": "http.response.body", "body": "".join(chunk).encode()})
+        return True
+
+
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def create_asgi_app(app=None) -> AsyncApp:
+    """Wrap the Flask app (created with create_app() if not given) in the ASGI app."""
+    if app is None:
+        from . import create_app
+        app = create_app()
+    return AsyncApp(app)
@@ -3,6 +3,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from .models import db, User, Participation, TripProposal, ProposalStatus
 from .forms import RegisterForm, LoginForm, ProfileForm
+from .unread import unread_counts
 import re
 
 auth_bp = Blueprint("auth", __name__)
@@ -80,7 +81,10 @@ def profile_view(user_id):
     active = [p for p in proposals if p and p.status in (ProposalStatus.open, ProposalStatus.closed_to_new_participants)]
     inactive = [p for p in proposals if p and p.status in (ProposalStatus.finalized, ProposalStatus.cancelled)]
 
-    return render_template("profile_view.html", user=user, active_proposals=active, inactive_proposals=inactive)
+    # Unread counts are only shown on your own profile
+    unread = unread_counts(user.id) if user.id == current_user.id else {}
+
+    return render_template("profile_view.html", user=user, active_proposals=active, inactive_proposals=inactive, unread=unread)
 
 
 
@@ -0,0 +1,242 @@
+"""
+Place-name autocomplete for the departure / destination inputs.
+
+Suggestions come from an in-memory prefix trie over the distinct departure and
+destination values already used on proposals, weighted by how often each is
+used, so people converge on one spelling per place. Values are matched
+case- and whitespace-insensitively; the most common spelling is suggested.
+
+Every trie node keeps its top completions, so a lookup is a walk down the
+prefix. The trie is built with one grouped query in a background thread at startup
+(suggestions are empty until it is ready), updated in place when proposals
+are created, edited or deleted in this process, and rebuilt in the background
+every AUTOCOMPLETE_REBUILD_INTERVAL seconds to pick up changes made elsewhere
+(other workers, imports); the old trie keeps serving meanwhile, and changes
+made here while the rebuild's query runs are replayed onto the new trie.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, TripProposal
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+
+
+def normalize(value: str | None) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+class _Node:
+    __slots__ = ("children", "best", "stale")
+
+    def __init__(self):
+        self.children: dict[str, "_Node"] = {}
+        self.best: list[str] = []   # keys of the top completions below this node
+        self.stale = False          # best must be recomputed from the subtree
+
+
+class PrefixIndex:
+    """Prefix trie of place names weighted by frequency."""
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self.root = _Node()
+        self.counts: Counter = Counter()            # key -> number of uses
+        self.spellings: dict[str, Counter] = {}     # key -> spelling -> number of uses
+        self._lock = threading.Lock()
+
+    def _rank(self, key: str):
+        return (-self.counts[key], key)
+
+    def _path(self, key: str, create: bool = False):
+        node = self.root
+        yield node
+        for ch in key:
+            child = node.children.get(ch)
+            if child is None:
+                if not create:
+                    return
+                child = node.children[ch] = _Node()
+            node = child
+            yield node
+
+    def add(self, value: str | None, count: int = 1) -> None:
+        key = normalize(value)
+        if not key or count <= 0:
+            return
+        with self._lock:
+            self.counts[key] += count
+            self.spellings.setdefault(key, Counter())[value.strip()] += count
+            rank = self._rank(key)
+            for node in self._path(key, create=True):
+                if key not in node.best:
+                    if len(node.best) >= self.top_k and rank > self._rank(node.best[-1]):
+                        continue
+                    node.best.append(key)
+                node.best.sort(key=self._rank)
+                del node.best[self.top_k:]
+
+    def remove(self, value: str | None, count: int = 1) -> None:
+        key = normalize(value)
+        if not key or key not in self.counts:
+            return
+        with self._lock:
+            self.counts[key] -= count
+            spellings = self.spellings[key]
+            spellings[value.strip()] -= count
+            if spellings[value.strip()] <= 0:
+                del spellings[value.strip()]
+            if self.counts[key] <= 0:
+                del self.counts[key]
+                del self.spellings[key]
+            for node in self._path(key):
+                if key not in node.best:
+                    continue
+                full = len(node.best) == self.top_k
+                if key in self.counts:
+                    node.best.sort(key=self._rank)
+                    displaced = node.best[-1] == key
+                else:
+                    node.best.remove(key)
+                    displaced = True
+                # A key outside a full `best` may now outrank the last entry
+                if full and displaced:
+                    node.stale = True
+
+    def _refresh(self, node: _Node, prefix: str) -> None:
+        keys = []
+        stack = [(node, prefix)]
+        while stack:
+            n, p = stack.pop()
+            if p in self.counts:
+                keys.append(p)
+            stack.extend((child, p + ch) for ch, child in n.children.items())
+        node.best = sorted(keys, key=self._rank)[:self.top_k]
+        node.stale = False
+
+    def complete(self, prefix: str, limit: int = TOP_K) -> list[dict]:
+        """Return up to `limit` suggestions [{"value", "count"}] for a prefix, most used first."""
+        key = normalize(prefix)
+        with self._lock:
+            node = self.root
+            for ch in key:
+                node = node.children.get(ch)
+                if node is None:
+                    return []
+            if node.stale:
+                self._refresh(node, key)
+            return [
+                {"value": self.spellings[k].most_common(1)[0][0], "count": self.counts[k]}
+                for k in node.best[:limit]
+            ]
+
+
+def build_index() -> PrefixIndex:
+    """Build the index from one grouped query over both location columns."""
+    values = db.union_all(
+        db.select(TripProposal.departure_location.label("value")),
+        db.select(TripProposal.destination.label("value")),
+    ).subquery()
+    rows = db.session.execute(
+        db.select(values.c.value, db.func.count()).where(values.c.value.is_not(None)).group_by(values.c.value)
+    )
+    index = PrefixIndex()
+    # Most used first, so full nodes can skip the rest without re-sorting
+    for value, count in sorted(rows, key=lambda row: -row[1]):
+        index.add(value, count)
+    return index
+
+
+class _IndexHolder:
+    """The app's current index plus the state of its background rebuilds."""
+
+    def __init__(self):
+        self.index: PrefixIndex | None = None
+        self.built_at = 0.0
+        self.building = False
+        self.pending: list = []   # changes made while a rebuild is running
+        self.lock = threading.Lock()
+
+
+def _holder(app) -> _IndexHolder:
+    return app.extensions.setdefault("autocomplete", _IndexHolder())
+
+
+def _rebuild(app) -> None:
+    holder = _holder(app)
+    # Changes committed before the query runs are already in its result
+    with holder.lock:
+        holder.pending = []
+    try:
+        with app.app_context():
+            index = build_index()
+    except SQLAlchemyError as e:
+        logger.warning("Autocomplete index not built: %s", getattr(e, "orig", e))
+        with holder.lock:
+            holder.building = False
+        return
+    with holder.lock:
+        for change in holder.pending:
+            change(index)
+        holder.pending = []
+        holder.index, holder.built_at, holder.building = index, time.monotonic(), False
+
+
+def _start_rebuild(app) -> None:
+    holder = _holder(app)
+    with holder.lock:
+        if holder.building:
+            return
+        holder.building = True
+    threading.Thread(target=_rebuild, args=(app,), name="autocomplete-index", daemon=True).start()
+
+
+def get_autocomplete() -> PrefixIndex | None:
+    """
+    Return the app's index, or None while the first build is still running.
+    A stale index keeps serving while it is rebuilt in the background.
+    """
+    app = current_app._get_current_object()
+    holder = _holder(app)
+    interval = app.config.get("AUTOCOMPLETE_REBUILD_INTERVAL", 600)
+    if holder.index is None:
+        if not holder.building:
+            # The startup build failed (e.g. before init_db); build it now
+            holder.index, holder.built_at = build_index(), time.monotonic()
+    elif interval and time.monotonic() - holder.built_at > interval:
+        _start_rebuild(app)
+    return holder.index
+
+
+def warm_autocomplete(app) -> None:
+    """Build the index in the background at startup (if the tables do not exist yet, on first use)."""
+    _start_rebuild(app)
+
+
+def _apply(change) -> None:
+    holder = _holder(current_app)
+    with holder.lock:
+        if holder.index is not None:
+            change(holder.index)
+        if holder.building:
+            holder.pending.append(change)
+
+
+def index_locations(added=(), removed=()) -> None:
+    """Apply location values added to / removed from proposals in this process."""
+    added, removed = list(added), list(removed)
+
+    def change(index: PrefixIndex) -> None:
+        for value in removed:
+            index.remove(value)
+        for value in added:
+            index.add(value)
+
+    _apply(change)
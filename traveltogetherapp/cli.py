@@ -0,0 +1,104 @@
+"""Flask CLI commands (run with `flask --app app <command>`)."""
+import os
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .models import db, TripProposal
+from .transfer import iter_records, write_records, read_records, import_records
+from .slowlog import top_offenders
+from .sqlitedb import backup_database
+
+
+def register_cli(app):
+    """Register the project's CLI commands on an app."""
+    app.cli.add_command(export_trips)
+    app.cli.add_command(import_trips)
+    app.cli.add_command(slow_queries)
+    app.cli.add_command(backup_db)
+
+
+@click.command("export-trips")
+@click.option("--proposal", "proposal_id", type=int, default=None, help="Export only this proposal id.")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="Output file (default: stdout).")
+@with_appcontext
+def export_trips(proposal_id, fmt, output):
+    """Stream proposals, roster, messages and meetups to JSONL or CSV."""
+    if proposal_id is not None and not db.session.get(TripProposal, proposal_id):
+        raise click.ClickException(f"Proposal {proposal_id} not found.")
+
+    with click.open_file(output, "w", encoding="utf-8") as out:
+        count = write_records(iter_records(proposal_id), out, fmt)
+    click.echo(f"Exported {count} records.", err=True)
+
+
+@click.command("import-trips")
+@click.argument("source", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default=None,
+              help="Input format (default: from file extension).")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Validate only, do not insert.")
+@with_appcontext
+def import_trips(source, fmt, batch_size, dry_run):
+    """Validate and bulk-insert records produced by export-trips."""
+    if fmt is None:
+        fmt = "csv" if source.endswith(".csv") else "jsonl"
+
+    def progress(inserted, rate):
+        click.echo(f"  {inserted} rows ({rate:.0f} rows/s)", err=True)
+
+    with click.open_file(source, "r", encoding="utf-8") as stream:
+        summary = import_records(read_records(stream, fmt), batch_size=batch_size,
+                                 dry_run=dry_run, progress=progress)
+
+    for error in summary["errors"]:
+        click.echo(f"  rejected {error}", err=True)
+    action = "Validated" if dry_run else "Imported"
+    click.echo(
+        f"{action} {summary['inserted']} rows, rejected {summary['rejected']}, "
+        f"in {summary['seconds']:.2f} s ({summary['rows_per_second']:.0f} rows/s)."
+    )
+    if summary["rejected"]:
+        sys.exit(1)
+
+
+@click.command("slow-queries")
+@click.option("--limit", "-n", type=int, default=10, show_default=True)
+@click.option("--sort", type=click.Choice(["total", "max", "count"]), default="total", show_default=True)
+@click.option("--explain", is_flag=True, help="Show the EXPLAIN output of each statement.")
+@with_appcontext
+def slow_queries(limit, sort, explain):
+    """Print the slowest statement fingerprints from the slow-query log."""
+    path = current_app.config["SLOW_QUERY_LOG_PATH"]
+    offenders = top_offenders(path, limit=limit, sort=sort)
+    if not offenders:
+        click.echo(f"No slow queries logged in {path}.")
+        return
+
+    for i, g in enumerate(offenders, start=1):
+        click.echo(
+            f"{i:>2}. {g['total_ms']:10.1f} ms total  {g['count']:6d} calls  "
+            f"{g['total_ms'] / g['count']:8.1f} ms avg  {g['max_ms']:8.1f} ms max  [{g['fingerprint']}]"
+        )
+        click.echo(f"    endpoints: {', '.join(sorted(g['endpoints'])) or '-'}")
+        click.echo(f"    {g['statement'][:300]}")
+        if explain and g["explain"]:
+            for row in g["explain"] if isinstance(g["explain"], list) else [[g["explain"]]]:
+                click.echo(f"      {' | '.join(row)}")
+
+
+@click.command("backup-db")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), default=None,
+              help="Backup file (default: timestamped file in SQLITE_BACKUP_DIR, rotated).")
+@with_appcontext
+def backup_db(output):
+    """Take an online backup of the SQLite database."""
+    try:
+        path = backup_database(output)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Backed up to {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MiB).")
@@ -0,0 +1,303 @@
+"""
+Near-duplicate detection for new proposals.
+
+Open proposals are indexed by a MinHash signature of the character 3-grams of
+their destination's place name (the title when there is none), split into
+LSH bands. Each
+band is bucketed together with the month the trip starts, so a lookup for a new
+proposal is a few dozen dict lookups (its bands x neighbouring months)
+regardless of how many proposals are open. Candidates are then loaded from the
+database and scored exactly on destination, title and dates; only proposals
+that are still open, go to a similar destination and have overlapping or
+nearby dates are reported.
+
+Like the autocomplete index, the index lives in memory per process. It is
+built in a background thread at startup (the check is skipped until it is
+ready), updated when proposals are created, edited or deleted here, and
+rebuilt in the background every DUPLICATE_INDEX_REBUILD_INTERVAL seconds,
+which also drops proposals that are no longer open (those are filtered out
+when scoring anyway).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from .autocomplete import normalize
+from .models import db, TripProposal, ProposalStatus
+
+logger = logging.getLogger(__name__)
+
+NUM_HASHES = 30
+BANDS = 10           # 10 bands of 3 rows: destinations above ~0.6 similarity almost always share a bucket
+ROWS = NUM_HASHES // BANDS
+NGRAM = 3
+
+MIN_SCORE = 0.5      # mean of destination and title similarity
+MIN_DESTINATION = 0.6
+DATE_SLACK_DAYS = 7  # date ranges this far apart still count as "similar dates"
+UNDATED_MONTHS = 12  # an undated new proposal is compared with trips starting in the next 12 months
+MAX_CANDIDATES = 200
+MAX_MATCHES = 5
+
+_MASK64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15
+_EMPTY = 1 << 64
+
+
+def ngrams(text: str | None) -> set[str]:
+    text = normalize(text)
+    if not text:
+        return set()
+    padded = f" {text} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def overlap(a: set, b: set) -> float:
+    """Overlap coefficient, so "Chamonix" fully matches "Chamonix, France"."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def place_name(destination: str | None) -> str:
+    """The most specific part of a location ("Chamonix" for "Chamonix, France")."""
+    return (destination or "").split(",")[0]
+
+
+def shingles(title: str | None, destination: str | None) -> set[str]:
+    return ngrams(place_name(destination)) or ngrams(title)
+
+
+def signature(tokens: set[str]) -> tuple[int, ...]:
+    """
+    One-permutation MinHash: each token hash goes to one of NUM_HASHES bins and
+    each bin keeps its minimum, so a signature costs one hash per token. Empty
+    bins borrow from the next non-empty bin (densification).
+    """
+    bins = [_EMPTY] * NUM_HASHES
+    for token in tokens:
+        h = (hash(token) * _MIX) & _MASK64
+        b = h % NUM_HASHES
+        if h < bins[b]:
+            bins[b] = h
+    for i in range(NUM_HASHES):
+        if bins[i] == _EMPTY:
+            for step in range(1, NUM_HASHES):
+                donor = bins[(i + step) % NUM_HASHES]
+                if donor != _EMPTY:
+                    bins[i] = hash((step, donor))
+                    break
+    return tuple(bins)
+
+
+def bands(sig: tuple[int, ...]) -> list[tuple]:
+    return [(b, sig[b * ROWS:(b + 1) * ROWS]) for b in range(BANDS)]
+
+
+def _month(d: date | None) -> int | None:
+    return d.year * 12 + d.month - 1 if d else None
+
+
+def _query_months(start: date | None, end: date | None) -> list[int | None]:
+    """Start months a similar trip may have: around this trip's dates, plus undated trips."""
+    if start or end:
+        first, last = _month(start or end), _month(end or start)
+        return [None] + list(range(first - 1, max(first, last) + 2))
+    today = _month(date.today())
+    return [None] + list(range(today, today + UNDATED_MONTHS + 1))
+
+
+class DuplicateIndex:
+    """LSH index of proposal ids by (MinHash band, start month)."""
+
+    def __init__(self):
+        self.buckets: dict[int, set[int]] = {}
+        self.keys: dict[int, list[int]] = {}   # proposal id -> its bucket keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, proposal_id: int, title, destination, start, end) -> None:
+        tokens = shingles(title, destination)
+        if not tokens:
+            return
+        month = _month(start or end)
+        keys = [hash((band, month)) for band in bands(signature(tokens))]
+        with self._lock:
+            self._discard(proposal_id)
+            self.keys[proposal_id] = keys
+            for key in keys:
+                self.buckets.setdefault(key, set()).add(proposal_id)
+
+    def remove(self, proposal_id: int) -> None:
+        with self._lock:
+            self._discard(proposal_id)
+
+    def _discard(self, proposal_id: int) -> None:
+        for key in self.keys.pop(proposal_id, ()):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(proposal_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def candidates(self, title, destination, start, end, limit: int = MAX_CANDIDATES) -> list[int]:
+        """Proposal ids sharing a bucket, most shared bands first."""
+        tokens = shingles(title, destination)
+        if not tokens:
+            return []
+        hits = Counter()
+        query_bands = bands(signature(tokens))
+        with self._lock:
+            for month in _query_months(start, end):
+                for band in query_bands:
+                    hits.update(self.buckets.get(hash((band, month)), ()))
+        return [proposal_id for proposal_id, _ in hits.most_common(limit)]
+
+
+def _dates_close(start, end, other_start, other_end) -> bool:
+    """True if the ranges overlap or are within DATE_SLACK_DAYS; unknown dates match anything."""
+    if not (start or end) or not (other_start or other_end):
+        return True
+    start, end = start or end, end or start
+    other_start, other_end = other_start or other_end, other_end or other_start
+    slack = timedelta(days=DATE_SLACK_DAYS)
+    return start <= other_end + slack and other_start <= end + slack
+
+
+def find_duplicates(title, destination, start, end, limit: int = MAX_MATCHES) -> list[tuple[TripProposal, float]]:
+    """Open proposals that look like the same trip, as (proposal, score), best first."""
+    index = get_duplicate_index()
+    ids = index.candidates(title, destination, start, end) if index is not None else []
+    if not ids:
+        return []
+    rows = db.session.execute(
+        db.select(TripProposal).where(TripProposal.id.in_(ids), TripProposal.status == ProposalStatus.open)
+    ).scalars()
+
+    title_grams, dest_grams, place_grams = ngrams(title), ngrams(destination), ngrams(place_name(destination))
+    matches = []
+    for p in rows:
+        dest_score = max(
+            jaccard(place_grams, ngrams(place_name(p.destination))),
+            overlap(dest_grams, ngrams(p.destination)),
+        ) if dest_grams else 0.0
+        if dest_grams and dest_score < MIN_DESTINATION:
+            continue
+        if not _dates_close(start, end, p.start_date, p.end_date):
+            continue
+        title_score = jaccard(title_grams, ngrams(p.title))
+        score = (title_score + dest_score) / 2 if dest_grams else title_score
+        if score >= MIN_SCORE:
+            matches.append((p, score))
+    matches.sort(key=lambda m: m[1], reverse=True)
+    return matches[:limit]
+
+
+def build_duplicate_index() -> DuplicateIndex:
+    index = DuplicateIndex()
+    rows = db.session.execute(
+        db.select(
+            TripProposal.id, TripProposal.title, TripProposal.destination,
+            TripProposal.start_date, TripProposal.end_date,
+        )
+        .where(TripProposal.status == ProposalStatus.open)
+        .execution_options(yield_per=5000)
+    )
+    for row in rows:
+        index.add(*row)
+    return index
+
+
+class _IndexHolder:
+    """The app's current index plus the state of its background rebuilds."""
+
+    def __init__(self):
+        self.index: DuplicateIndex | None = None
+        self.built_at = 0.0
+        self.building = False
+        self.pending: list = []   # changes made while a rebuild is running
+        self.lock = threading.Lock()
+
+
+def _holder(app) -> _IndexHolder:
+    return app.extensions.setdefault("duplicate_index", _IndexHolder())
+
+
+def _rebuild(app) -> None:
+    holder = _holder(app)
+    try:
+        with app.app_context():
+            index = build_duplicate_index()
+    except SQLAlchemyError as e:
+        logger.warning("Duplicate index not built: %s", getattr(e, "orig", e))
+        with holder.lock:
+            holder.building = False
+        return
+    with holder.lock:
+        for change in holder.pending:
+            change(index)
+        holder.pending = []
+        holder.index, holder.built_at, holder.building = index, time.monotonic(), False
+
+
+def _start_rebuild(app) -> None:
+    holder = _holder(app)
+    with holder.lock:
+        if holder.building:
+            return
+        holder.building = True
+    threading.Thread(target=_rebuild, args=(app,), name="duplicate-index", daemon=True).start()
+
+
+def get_duplicate_index() -> DuplicateIndex | None:
+    """
+    Return the app's index, or None while the first build is still running.
+    A stale index keeps serving while it is rebuilt in the background.
+    """
+    app = current_app._get_current_object()
+    holder = _holder(app)
+    interval = app.config.get("DUPLICATE_INDEX_REBUILD_INTERVAL", 3600)
+    if holder.index is None:
+        if not holder.building:
+            # The startup build failed (e.g. before init_db); build it now
+            holder.index, holder.built_at = build_duplicate_index(), time.monotonic()
+    elif interval and time.monotonic() - holder.built_at > interval:
+        _start_rebuild(app)
+    return holder.index
+
+
+def warm_duplicate_index(app) -> None:
+    """Build the index in the background at startup (if the tables do not exist yet, on first use)."""
+    _start_rebuild(app)
+
+
+def _apply(change) -> None:
+    holder = _holder(current_app)
+    with holder.lock:
+        if holder.index is not None:
+            change(holder.index)
+        if holder.building:
+            holder.pending.append(change)
+
+
+def index_proposal(proposal: TripProposal) -> None:
+    """Add or refresh a proposal created or edited in this process."""
+    row = (proposal.id, proposal.title, proposal.destination, proposal.start_date, proposal.end_date)
+    _apply(lambda index: index.add(*row))
+
+
+def unindex_proposal(proposal_id: int) -> None:
+    _apply(lambda index: index.remove(proposal_id))
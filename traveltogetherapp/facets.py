@@ -0,0 +1,159 @@
+"""
+Facet histograms for the proposal discovery UI.
+
+All buckets (budget, departure month, free seats and status) are computed from
+a single grouped SQL query. The query groups by every facet dimension at once,
+and the marginal histograms are folded from the (small) grouped result, so no
+proposal rows are loaded into Python.
+"""
+from .models import db, TripProposal, Participation, ProposalStatus
+
+# Statuses shown in discovery when no explicit status filter is given
+DISCOVERY_STATUSES = (ProposalStatus.open, ProposalStatus.closed_to_new_participants)
+
+# Upper bounds of the budget buckets; anything above the last edge goes in "N+"
+DEFAULT_BUDGET_EDGES = (250, 500, 1000, 2000)
+
+# Free seats are bucketed as 0, 1, ..., MAX_SEAT_BUCKET-1 and "MAX_SEAT_BUCKET+"
+MAX_SEAT_BUCKET = 5
+
+
+def parse_filters(args) -> dict:
+    """Read the discovery filter set from request args."""
+    filters = {"statuses": [], "destination": None, "budget_min": None, "budget_max": None}
+
+    for raw in args.getlist("status"):
+        try:
+            filters["statuses"].append(ProposalStatus[raw])
+        except KeyError:
+            pass
+
+    destination = args.get("destination", "").strip()
+    if destination:
+        filters["destination"] = destination
+
+    for key in ("budget_min", "budget_max"):
+        raw = args.get(key, "").strip()
+        if raw:
+            try:
+                filters[key] = float(raw)
+            except ValueError:
+                pass
+    return filters
+
+
+def discoverable_statuses(filters: dict) -> list:
+    """
+    The requested statuses that discovery may list. Finalized and cancelled
+    trips are not discoverable, so asking for them only affects the facet counts.
+    """
+    if not filters["statuses"]:
+        return list(DISCOVERY_STATUSES)
+    return [s for s in filters["statuses"] if s in DISCOVERY_STATUSES]
+
+
+def filter_conditions(filters: dict, include_status: bool = True) -> list:
+    """SQL conditions for a filter set (status is optional so it can be faceted)."""
+    conditions = []
+    if include_status:
+        conditions.append(TripProposal.status.in_(discoverable_statuses(filters)))
+    if filters["destination"]:
+        conditions.append(TripProposal.destination.ilike(f"%{filters['destination']}%"))
+    if filters["budget_min"] is not None:
+        conditions.append(TripProposal.budget >= filters["budget_min"])
+    if filters["budget_max"] is not None:
+        conditions.append(TripProposal.budget <= filters["budget_max"])
+    return conditions
+
+
+def _budget_labels(edges) -> list[str]:
+    labels = []
+    lower = 0
+    for edge in edges:
+        labels.append(f"{lower:g}-{edge:g}")
+        lower = edge
+    labels.append(f"{lower:g}+")
+    return labels
+
+
+def compute_facets(filters: dict, budget_edges=DEFAULT_BUDGET_EDGES) -> dict:
+    """Return budget, month, free-seat and status histograms for a filter set."""
+    budget_labels = _budget_labels(budget_edges)
+
+    budget_bucket = db.case(
+        *[(TripProposal.budget < edge, i) for i, edge in enumerate(budget_edges)],
+        else_=len(budget_edges),
+    )
+    budget_bucket = db.case((TripProposal.budget.is_(None), None), else_=budget_bucket)
+
+    participant_counts = (
+        db.select(
+            Participation.proposal_id,
+            db.func.count(Participation.id).label("n"),
+        )
+        .group_by(Participation.proposal_id)
+        .subquery()
+    )
+    free = TripProposal.max_participants - db.func.coalesce(participant_counts.c.n, 0)
+    seats_bucket = db.case(
+        (TripProposal.max_participants.is_(None), None),
+        (free <= 0, 0),
+        (free >= MAX_SEAT_BUCKET, MAX_SEAT_BUCKET),
+        else_=free,
+    )
+
+    year = db.extract("year", TripProposal.start_date)
+    month = db.extract("month", TripProposal.start_date)
+
+    # Status is grouped on, not filtered on, so the status facet shows counts
+    # for every status while the other facets only count the selected ones.
+    query = (
+        db.select(
+            TripProposal.status,
+            budget_bucket.label("budget_bucket"),
+            year.label("year"),
+            month.label("month"),
+            seats_bucket.label("seats_bucket"),
+            db.func.count().label("n"),
+        )
+        .outerjoin(participant_counts, participant_counts.c.proposal_id == TripProposal.id)
+        .where(*filter_conditions(filters, include_status=False))
+        .group_by(TripProposal.status, "budget_bucket", "year", "month", "seats_bucket")
+    )
+
+    selected = set(filters["statuses"] or DISCOVERY_STATUSES)
+    status_counts = {s.name: 0 for s in ProposalStatus}
+    budget = {label: 0 for label in budget_labels}
+    budget["unknown"] = 0
+    months: dict[str, int] = {}
+    seats = {str(i): 0 for i in range(MAX_SEAT_BUCKET)}
+    seats[f"{MAX_SEAT_BUCKET}+"] = 0
+    seats["unlimited"] = 0
+    total = 0
+
+    for status, b, y, m, s, n in db.session.execute(query):
+        if status is not None:
+            status_counts[status.name] += n
+        if status not in selected:
+            continue
+        total += n
+
+        budget[budget_labels[int(b)] if b is not None else "unknown"] += n
+
+        month_key = f"{int(y):04d}-{int(m):02d}" if y is not None else "unknown"
+        months[month_key] = months.get(month_key, 0) + n
+
+        if s is None:
+            seats["unlimited"] += n
+        elif int(s) >= MAX_SEAT_BUCKET:
+            seats[f"{MAX_SEAT_BUCKET}+"] += n
+        else:
+            seats[str(int(s))] += n
+
+    return {
+        "total": total,
+        "status": status_counts,
+        "budget": budget,
+        "departure_month": dict(sorted(months.items())),
+        "free_seats": seats,
+    }
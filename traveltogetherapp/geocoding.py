@@ -0,0 +1,248 @@
+"""
+Offline geocoding and proximity search for trip locations.
+
+Locations are resolved against a local gazetteer file, so no network access is
+needed. Two formats are accepted (tab-separated, one place per line):
+
+- Simple:   name <TAB> latitude <TAB> longitude [<TAB> alternate,names]
+- GeoNames: the standard "cities" dump (cities500.txt, cities15000.txt, ...)
+
+Resolved coordinates are stored on the proposal together with a geohash, and
+the geohash column is used as a grid index for radius queries.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from .models import db, TripProposal, ProposalStatus
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 7
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+# --- Geohash -----------------------------------------------------------------
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def _geohash_bounds(gh: str):
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for c in gh:
+        val = _BASE32.index(c)
+        for shift in range(4, -1, -1):
+            bit = (val >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lat_hi, lon_lo, lon_hi
+
+
+def geohash_neighbors(gh: str) -> set[str]:
+    """Return the cell itself and its (up to) eight surrounding cells."""
+    lat_lo, lat_hi, lon_lo, lon_hi = _geohash_bounds(gh)
+    dlat = lat_hi - lat_lo
+    dlon = lon_hi - lon_lo
+    clat = (lat_lo + lat_hi) / 2
+    clon = (lon_lo + lon_hi) / 2
+    cells = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            lat = clat + i * dlat
+            if lat > 90 or lat < -90:
+                continue
+            lon = (clon + j * dlon + 180) % 360 - 180
+            cells.add(geohash_encode(lat, lon, len(gh)))
+    return cells
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates in kilometres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _precision_for_radius(lat: float, radius_km: float) -> int:
+    """Finest precision whose cells at this latitude are at least as large as the radius."""
+    km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        bits = 5 * precision
+        height = 180 / 2 ** (bits // 2) * km_per_degree
+        width = 360 / 2 ** ((bits + 1) // 2) * km_per_degree * math.cos(math.radians(lat))
+        if min(height, width) >= radius_km:
+            return precision
+    return 1
+
+
+# --- Gazetteer ---------------------------------------------------------------
+
+class Geocoder:
+    """
+    Resolve free-text locations using an in-memory gazetteer with an LRU cache.
+    One instance is shared by all request threads, so the cache is guarded by a lock.
+    """
+
+    def __init__(self, path: str | None = None, cache_size: int = 4096):
+        self.places: dict[str, tuple[float, float]] = {}
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[float, float] | None] = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path: str) -> None:
+        """Load a gazetteer file. Larger places win when names collide."""
+        population: dict[str, int] = {}
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                cols = line.rstrip("\n").split("\t")
+                try:
+                    if len(cols) >= 15:
+                        # GeoNames: name, asciiname, alternatenames, lat, lon, ... population
+                        names = [cols[1], cols[2]] + cols[3].split(",")
+                        coords = (float(cols[4]), float(cols[5]))
+                        pop = int(cols[14] or 0)
+                    else:
+                        names = [cols[0]] + (cols[3].split(",") if len(cols) > 3 else [])
+                        coords = (float(cols[1]), float(cols[2]))
+                        pop = 0
+                except (ValueError, IndexError):
+                    continue
+                for name in names:
+                    key = _normalize(name)
+                    if key and pop >= population.get(key, -1):
+                        self.places[key] = coords
+                        population[key] = pop
+        with self._lock:
+            self._cache.clear()
+
+    def resolve(self, text: str | None) -> tuple[float, float] | None:
+        """Return (lat, lon) for a location string, or None if it is unknown."""
+        if not text:
+            return None
+        key = _normalize(text)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        coords = self.places.get(key)
+        if coords is None:
+            # Nominatim-style "Madrid, Comunidad de Madrid, España": try each part in order
+            for part in key.split(","):
+                coords = self.places.get(part.strip())
+                if coords is not None:
+                    break
+
+        with self._lock:
+            self._cache[key] = coords
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return coords
+
+
+def get_geocoder() -> Geocoder:
+    """Return the geocoder for the current app, loading the gazetteer on first use."""
+    geocoder = current_app.extensions.get("geocoder")
+    if geocoder is None:
+        geocoder = Geocoder(
+            current_app.config.get("GAZETTEER_PATH"),
+            current_app.config.get("GEOCODE_CACHE_SIZE", 4096),
+        )
+        current_app.extensions["geocoder"] = geocoder
+    return geocoder
+
+
+def apply_geocodes(proposal: TripProposal, geocoder: Geocoder | None = None) -> None:
+    """Set coordinates and geohashes for departure and destination on a proposal."""
+    geocoder = geocoder or get_geocoder()
+    for field in ("departure", "destination"):
+        text = proposal.departure_location if field == "departure" else proposal.destination
+        coords = geocoder.resolve(text)
+        if coords:
+            setattr(proposal, f"{field}_lat", coords[0])
+            setattr(proposal, f"{field}_lon", coords[1])
+            setattr(proposal, f"{field}_geohash", geohash_encode(*coords))
+        else:
+            setattr(proposal, f"{field}_lat", None)
+            setattr(proposal, f"{field}_lon", None)
+            setattr(proposal, f"{field}_geohash", None)
+
+
+def proposals_near(lat: float, lon: float, radius_km: float, field: str = "destination"):
+    """
+    Return open proposals whose departure or destination lies within radius_km,
+    as a list of (proposal, distance_km) sorted by distance.
+    """
+    geohash_col = getattr(TripProposal, f"{field}_geohash")
+    lat_attr = f"{field}_lat"
+    lon_attr = f"{field}_lon"
+
+    # Candidate cells: the cell containing the point and its neighbours, at a
+    # precision where one cell covers the whole radius. Prefix LIKE uses the index.
+    precision = _precision_for_radius(lat, radius_km)
+    cells = geohash_neighbors(geohash_encode(lat, lon, precision))
+
+    query = db.select(TripProposal).where(
+        TripProposal.status == ProposalStatus.open,
+        db.or_(*[geohash_col.like(f"{cell}%") for cell in cells]),
+    )
+    results = []
+    for p in db.session.execute(query).scalars():
+        distance = haversine_km(lat, lon, getattr(p, lat_attr), getattr(p, lon_attr))
+        if distance <= radius_km:
+            results.append((p, distance))
+    results.sort(key=lambda r: r[1])
+    return results
@@ -0,0 +1,314 @@
+"""
+In-process background job runner backed by the `job` table.
+
+Jobs are claimed with a conditional UPDATE that sets a lease (locked_by /
+locked_until), so when several processes run the app only one worker runs each
+job. The runner renews the leases of its running jobs on every poll, so a job
+may run longer than JOB_LEASE_SECONDS; a job whose lease expires (e.g. the
+worker died) becomes claimable again. A job is only marked done / failed by
+the worker that still holds its lease. Failed jobs are retried with
+exponential backoff up to max_attempts. Finished jobs are deleted by the
+periodic `prune_jobs` job after JOB_RETENTION_DAYS.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+
+from flask import current_app
+
+from .models import db, Job, JobStatus, TripProposal, ProposalStatus
+
+# Registered job handlers: name -> callable(payload: dict)
+JOB_HANDLERS = {}
+
+# Simple in-process metrics: name -> {"count", "total", "max", "last"}
+JOB_METRICS = {}
+_metrics_lock = threading.Lock()
+
+
+def job_handler(name: str):
+    """Register a function as the handler for jobs with this name."""
+    def decorator(fn):
+        JOB_HANDLERS[name] = fn
+        return fn
+    return decorator
+
+
+def record_metric(name: str, value: float) -> None:
+    with _metrics_lock:
+        m = JOB_METRICS.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        m["count"] += 1
+        m["total"] += value
+        m["max"] = max(m["max"], value)
+        m["last"] = value
+
+
+def enqueue(name: str, payload: dict | None = None, run_at: datetime | None = None,
+            max_attempts: int | None = None) -> Job:
+    """Add a job to the queue. The caller is responsible for committing."""
+    job = Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        status=JobStatus.pending,
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts or current_app.config.get("JOB_MAX_ATTEMPTS", 3),
+    )
+    db.session.add(job)
+    return job
+
+
+class JobRunner:
+    """Polls the job table and runs due jobs on a thread pool."""
+
+    def __init__(self, app, workers: int = 2, poll_interval: float = 10,
+                 lease_seconds: int = 300, periodic: dict | None = None):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        # name -> interval in seconds; enqueued whenever no such job is pending
+        self.periodic = periodic or {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._stop = threading.Event()
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self._next_periodic = {}
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=wait)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self._renew_leases()
+                    self._schedule_periodic()
+                    for job_id in self._claim(self.workers - self._active):
+                        with self._active_lock:
+                            self._active += 1
+                        self._executor.submit(self._run, job_id)
+            except Exception:
+                self.app.logger.exception("[jobs] poll failed")
+            self._stop.wait(self.poll_interval)
+
+    def _renew_leases(self) -> None:
+        """Extend the lease of every job this worker is still running."""
+        if not self._active:
+            return
+        db.session.execute(
+            db.update(Job)
+            .where(Job.locked_by == self.worker_id, Job.status == JobStatus.running)
+            .values(locked_until=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def _finish(self, job_id: int, **values) -> bool:
+        """Write a job's outcome if this worker still holds its lease."""
+        result = db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, Job.locked_by == self.worker_id)
+            .values(locked_by=None, locked_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            self.app.logger.warning(f"[jobs] #{job_id} lost its lease before finishing; outcome discarded")
+            return False
+        return True
+
+    def _schedule_periodic(self) -> None:
+        now = time.monotonic()
+        for name, interval in self.periodic.items():
+            if now < self._next_periodic.get(name, 0):
+                continue
+            self._next_periodic[name] = now + interval
+            query = db.select(db.func.count(Job.id)).where(
+                Job.name == name,
+                Job.status.in_([JobStatus.pending, JobStatus.running]),
+            )
+            if not db.session.execute(query).scalar():
+                enqueue(name)
+                db.session.commit()
+
+    def _claim(self, limit: int) -> list[int]:
+        """Lease up to `limit` due jobs for this worker and return their ids."""
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        claimable = db.or_(
+            db.and_(Job.status == JobStatus.pending, Job.run_at <= now),
+            # A running job whose lease has expired was abandoned by its worker
+            db.and_(Job.status == JobStatus.running, Job.locked_until < now),
+        )
+        query = db.select(Job.id).where(claimable).order_by(Job.run_at).limit(limit)
+        candidates = db.session.execute(query).scalars().all()
+
+        claimed = []
+        for job_id in candidates:
+            # Conditional update: only one worker can win the lease
+            result = db.session.execute(
+                db.update(Job)
+                .where(Job.id == job_id, claimable)
+                .values(
+                    status=JobStatus.running,
+                    locked_by=self.worker_id,
+                    locked_until=now + timedelta(seconds=self.lease_seconds),
+                    attempts=Job.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        db.session.commit()
+        return claimed
+
+    def _run(self, job_id: int) -> None:
+        try:
+            with self.app.app_context():
+                self._execute(job_id)
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    def _execute(self, job_id: int) -> None:
+        job = db.session.get(Job, job_id)
+        if job is None or job.locked_by != self.worker_id:
+            return
+
+        name, payload, attempts, max_attempts = job.name, job.payload, job.attempts, job.max_attempts
+        started = time.perf_counter()
+        try:
+            handler = JOB_HANDLERS.get(name)
+            if handler is None:
+                raise LookupError(f"No handler registered for job '{name}'")
+            handler(json.loads(payload or "{}"))
+        except Exception as e:
+            db.session.rollback()
+            if attempts >= max_attempts:
+                outcome = {"status": JobStatus.failed, "finished_at": datetime.utcnow()}
+            else:
+                retry_at = datetime.utcnow() + timedelta(seconds=30 * 2 ** (attempts - 1))
+                outcome = {"status": JobStatus.pending, "run_at": retry_at}
+            self._finish(job_id, last_error=f"{type(e).__name__}: {e}", **outcome)
+            record_metric(f"{name}.failures", 1)
+            self.app.logger.exception(f"[jobs] {name} #{job_id} failed (attempt {attempts})")
+            return
+
+        if self._finish(job_id, status=JobStatus.done, finished_at=datetime.utcnow()):
+            record_metric(f"{name}.duration", time.perf_counter() - started)
+
+
+def start_job_runner(app) -> JobRunner:
+    """Create and start the job runner for an app (see JOBS_* settings in config)."""
+    from . import notifications  # noqa: F401  (registers send_digests)
+    from .sqlitedb import is_sqlite, database_path
+
+    periodic = {
+        "expire_proposals": app.config.get("EXPIRE_PROPOSALS_INTERVAL", 3600),
+        "prune_jobs": app.config.get("JOB_PRUNE_INTERVAL", 86400),
+    }
+    if app.config.get("NOTIFY_DIGESTS_ENABLED"):
+        periodic["send_digests"] = app.config.get("NOTIFY_DIGEST_WINDOW", 900)
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    if is_sqlite(uri) and database_path(uri) and app.config.get("SQLITE_BACKUP_INTERVAL"):
+        periodic["backup_sqlite"] = app.config["SQLITE_BACKUP_INTERVAL"]
+
+    runner = JobRunner(
+        app,
+        workers=app.config.get("JOB_WORKERS", 2),
+        poll_interval=app.config.get("JOB_POLL_INTERVAL", 10),
+        lease_seconds=app.config.get("JOB_LEASE_SECONDS", 300),
+        periodic=periodic,
+    )
+    runner.start()
+    app.extensions["job_runner"] = runner
+    return runner
+
+
+# --- Job handlers ------------------------------------------------------------
+
+def _transition_in_batches(condition, new_status: ProposalStatus, batch_size: int) -> int:
+    """Set `new_status` on every proposal matching `condition`, one batch of ids at a time."""
+    total = 0
+    while True:
+        started = time.perf_counter()
+        ids = db.session.execute(
+            db.select(TripProposal.id).where(condition).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(
+            db.update(TripProposal)
+            .where(TripProposal.id.in_(ids), condition)
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += len(ids)
+
+        duration = time.perf_counter() - started
+        record_metric("expire_proposals.batch_size", len(ids))
+        record_metric("expire_proposals.batch_duration", duration)
+        current_app.logger.info(
+            f"[jobs] expire_proposals: {new_status.name} batch of {len(ids)} in {duration * 1000:.1f} ms"
+        )
+    return total
+
+
+@job_handler("prune_jobs")
+def prune_jobs(payload: dict) -> None:
+    """Delete done and failed jobs that finished more than JOB_RETENTION_DAYS ago."""
+    days = payload.get("days") or current_app.config.get("JOB_RETENTION_DAYS", 7)
+    result = db.session.execute(
+        db.delete(Job)
+        .where(
+            Job.status.in_([JobStatus.done, JobStatus.failed]),
+            Job.finished_at < datetime.utcnow() - timedelta(days=days),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    current_app.logger.info(f"[jobs] prune_jobs: deleted {result.rowcount} finished jobs")
+
+
+@job_handler("expire_proposals")
+def expire_proposals(payload: dict) -> None:
+    """
+    Close proposals whose trip has started and finalize those that are over.
+
+    A trip is over once its end date (or start date, if it has no end date) has
+    passed; a trip that has started but not ended is closed to new participants.
+    """
+    batch_size = payload.get("batch_size") or current_app.config.get("EXPIRE_PROPOSALS_BATCH_SIZE", 500)
+    today = date.fromisoformat(payload["today"]) if payload.get("today") else date.today()
+
+    active = TripProposal.status.in_([ProposalStatus.open, ProposalStatus.closed_to_new_participants])
+    over = db.func.coalesce(TripProposal.end_date, TripProposal.start_date) < today
+    finalized = _transition_in_batches(db.and_(active, over), ProposalStatus.finalized, batch_size)
+
+    started = db.and_(TripProposal.status == ProposalStatus.open, TripProposal.start_date < today)
+    closed = _transition_in_batches(started, ProposalStatus.closed_to_new_participants, batch_size)
+
+    current_app.logger.info(f"[jobs] expire_proposals: finalized {finalized}, closed {closed}")
+
+
+@job_handler("backup_sqlite")
+def backup_sqlite(payload: dict) -> None:
+    """Take an online backup of the SQLite database (SQLITE_BACKUP_* settings)."""
+    from .sqlitedb import backup_database
+
+    backup_database(payload.get("destination"))
@@ -0,0 +1,135 @@
+"""
+Membership checks for proposal routes.
+
+`membership_required` replaces the per-route get_or_404 / participation
+lookup / can_edit preamble: it loads the proposal and the caller's
+participation with one joined query and passes `proposal` and `membership`
+to the view.
+
+Memberships are also kept in a short-lived per-process cache keyed by
+(user, proposal). On a hit only the proposal is loaded, by primary key.
+join, leave, grant-edit and delete invalidate the affected entries in the
+process that handled them; other workers see the change after at most
+MEMBERSHIP_CACHE_TTL seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import NamedTuple
+
+from flask import abort, current_app, flash, redirect, url_for
+from flask_login import current_user
+
+from .models import db, TripProposal
+from .queries import proposal_membership_query
+
+_MISS = object()
+
+
+class Membership(NamedTuple):
+    """The parts of a Participation the routes need for authorization."""
+    participation_id: int
+    can_edit: bool
+
+
+class MembershipCache:
+    """(user_id, proposal_id) -> Membership or None (not a participant), with a TTL."""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, proposal_id: int):
+        """Return the cached Membership / None, or _MISS."""
+        key = (user_id, proposal_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISS
+            expires, membership = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return _MISS
+            return membership
+
+    def set(self, user_id: int, proposal_id: int, membership: Membership | None) -> None:
+        if self.ttl <= 0:
+            return
+        key = (user_id, proposal_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, membership)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, proposal_id: int, user_id: int | None = None) -> None:
+        """Drop one user's entry, or every entry of the proposal if user_id is None."""
+        with self._lock:
+            if user_id is not None:
+                self._entries.pop((user_id, proposal_id), None)
+            else:
+                for key in [k for k in self._entries if k[1] == proposal_id]:
+                    del self._entries[key]
+
+
+def get_membership_cache() -> MembershipCache:
+    cache = current_app.extensions.get("membership_cache")
+    if cache is None:
+        cache = MembershipCache(
+            current_app.config.get("MEMBERSHIP_CACHE_TTL", 30),
+            current_app.config.get("MEMBERSHIP_CACHE_SIZE", 10000),
+        )
+        current_app.extensions["membership_cache"] = cache
+    return cache
+
+
+def invalidate_membership(proposal_id: int, user_id: int | None = None) -> None:
+    """Call after a change to a proposal's roster or edit rights."""
+    get_membership_cache().invalidate(proposal_id, user_id)
+
+
+def load_membership(proposal_id: int, user_id: int):
+    """Return (proposal, Membership or None); aborts with 404 if the proposal does not exist."""
+    cache = get_membership_cache()
+    membership = cache.get(user_id, proposal_id)
+    if membership is not _MISS:
+        proposal = db.session.get(TripProposal, proposal_id)
+        if proposal is None:
+            cache.invalidate(proposal_id)
+            abort(404)
+        return proposal, membership
+
+    row = db.session.execute(proposal_membership_query(proposal_id, user_id)).one_or_none()
+    if row is None:
+        abort(404)
+    proposal, participation = row
+    membership = Membership(participation.id, bool(participation.can_edit)) if participation else None
+    cache.set(user_id, proposal_id, membership)
+    return proposal, membership
+
+
+def membership_required(editor: bool = False, message: str | None = None):
+    """
+    Decorate a view taking proposal_id so it also receives `proposal` and `membership`.
+
+    Participants are required (editors if `editor`). Otherwise `message` is
+    flashed and the user redirected - to the proposal for editor checks, to the
+    list for participant checks - or, without a message, the request aborts with 403.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(proposal_id: int, **kwargs):
+            proposal, membership = load_membership(proposal_id, current_user.id)
+            if membership is None or (editor and not membership.can_edit):
+                if message is None:
+                    abort(403)
+                flash(message, "danger")
+                if editor:
+                    return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
+                return redirect(url_for("proposals.list_proposals"))
+            return view(proposal_id, proposal=proposal, membership=membership, **kwargs)
+        return wrapper
+    return decorator
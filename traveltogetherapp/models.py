@@ -18,6 +18,8 @@ class User(UserMixin, db.Model):
     description = db.Column(db.Text)
     # Optional display alias shown across the site (e.g., "Alex", "Traveller123")
     alias = db.Column(db.String(50), nullable=True)
+    # Moderators may apply bulk status transitions to any proposal
+    is_moderator = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     # Relationships
     messages = db.relationship("Message", backref="author", lazy=True)
@@ -35,6 +37,14 @@ class TripProposal(db.Model):
     start_date = db.Column(db.Date, nullable=True)
     end_date = db.Column(db.Date, nullable=True)
     activities = db.Column(db.Text, nullable=True)  # Comma-separated or JSON string
+
+    # Coordinates resolved from the offline gazetteer (see geocoding.py)
+    departure_lat = db.Column(db.Float, nullable=True)
+    departure_lon = db.Column(db.Float, nullable=True)
+    departure_geohash = db.Column(db.String(12), nullable=True, index=True)
+    destination_lat = db.Column(db.Float, nullable=True)
+    destination_lon = db.Column(db.Float, nullable=True)
+    destination_geohash = db.Column(db.String(12), nullable=True, index=True)
     
     # Boolean fields indicating if information is final
     departure_location_is_final = db.Column(db.Boolean, default=False)
@@ -45,8 +55,15 @@ class TripProposal(db.Model):
     
     status = db.Column(db.Enum(ProposalStatus), default=ProposalStatus.open)
 
+    # Incrementally maintained number of messages (used for unread counters)
+    message_count = db.Column(db.Integer, default=0, nullable=False, server_default="0")
+
     creator_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    # Optimistic concurrency: every ORM UPDATE checks and increments this counter
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     participations = db.relationship(
         "Participation",
         backref="proposal_parent",
@@ -60,9 +77,13 @@ class TripProposal(db.Model):
 
 class Participation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
     proposal_id = db.Column(db.Integer, db.ForeignKey("trip_proposal.id"))
     can_edit = db.Column(db.Boolean, default=False)
+
+    # Read cursor: newest message id (and message count) seen on the detail page
+    last_read_message_id = db.Column(db.Integer, default=0, nullable=False, server_default="0")
+    read_message_count = db.Column(db.Integer, default=0, nullable=False, server_default="0")
     
     # Relationship to User
     user = db.relationship("User", backref="participations", lazy=True)
@@ -74,9 +95,51 @@ class Message(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     proposal_id = db.Column(db.Integer, db.ForeignKey("trip_proposal.id"))
 
+    # Unread counts scan messages of one trip newer than a cursor
+    __table_args__ = (db.Index("ix_message_proposal_id_id", "proposal_id", "id"),)
+
 class Meetup(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     location = db.Column(db.String(100), nullable=True)
     datetime = db.Column(db.DateTime, nullable=True)
     proposal_id = db.Column(db.Integer, db.ForeignKey("trip_proposal.id"))
     creator_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+
+
+class EventKind(enum.Enum):
+    message = 1
+    meetup = 2
+    join = 3
+    leave = 4
+
+class NotificationEvent(db.Model):
+    """Something that happened on a trip; deleted once it has been sent in a digest."""
+    id = db.Column(db.Integer, primary_key=True)
+    proposal_id = db.Column(db.Integer, db.ForeignKey("trip_proposal.id"), index=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    kind = db.Column(db.Enum(EventKind), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class JobStatus(enum.Enum):
+    pending = 1
+    running = 2
+    done = 3
+    failed = 4
+
+class Job(db.Model):
+    """A unit of background work, claimed by a worker through a time-limited lease."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=True)  # JSON string
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.pending, index=True)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+
+    # Lease: the worker holding the job and when its claim expires
+    locked_by = db.Column(db.String(64), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,187 @@
+"""
+Notification digests for trip participants.
+
+When NOTIFY_DIGESTS_ENABLED is set, routes record one NotificationEvent per
+action (message, meetup, join, leave). The `send_digests` job periodically
+coalesces all pending events with a single grouped query (event x
+participation), so a burst of 500 messages on a trip yields one digest per
+participant, and writes the digests to an outbox.
+
+The default outbox is a local SQLite file; `drain_outbox.py` delivers its
+contents to an SMTP server (e.g. a local stand-in such as `python -m aiosmtpd -n`).
+"""
+import sqlite3
+import smtplib
+from datetime import datetime
+from email import message_from_string
+from email.message import EmailMessage
+
+from flask import current_app
+
+from .jobs import job_handler
+from .models import db, NotificationEvent, EventKind, Participation, TripProposal, User
+
+_KIND_LABELS = {
+    EventKind.message: ("new message", "new messages"),
+    EventKind.meetup: ("new meetup suggestion", "new meetup suggestions"),
+    EventKind.join: ("participant joined", "participants joined"),
+    EventKind.leave: ("participant left", "participants left"),
+}
+
+
+def record_event(proposal_id: int, kind: EventKind, actor_id: int | None = None) -> None:
+    """
+    Record an event on a trip. Committed together with the caller's changes.
+    Only send_digests deletes events, so nothing is recorded while digests are disabled.
+    """
+    if not current_app.config.get("NOTIFY_DIGESTS_ENABLED"):
+        return
+    db.session.add(NotificationEvent(proposal_id=proposal_id, kind=kind, actor_id=actor_id))
+
+
+# --- Outboxes ----------------------------------------------------------------
+
+class Outbox:
+    """Destination for rendered digests. Subclasses implement put() and drain()."""
+
+    def put(self, messages: list[EmailMessage]) -> None:
+        raise NotImplementedError
+
+    def drain(self, deliver) -> int:
+        """Pass each queued message to `deliver` and mark it sent once delivered."""
+        raise NotImplementedError
+
+
+class SQLiteOutbox(Outbox):
+    """Outbox stored in a standalone SQLite file, independent of the main database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " id INTEGER PRIMARY KEY,"
+                " recipient TEXT NOT NULL,"
+                " message TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " sent_at TEXT)"
+            )
+
+    def put(self, messages: list[EmailMessage]) -> None:
+        now = datetime.utcnow().isoformat()
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany(
+                "INSERT INTO outbox (recipient, message, created_at) VALUES (?, ?, ?)",
+                [(m["To"], m.as_string(), now) for m in messages],
+            )
+
+    def drain(self, deliver) -> int:
+        sent = 0
+        with sqlite3.connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT id, message FROM outbox WHERE sent_at IS NULL ORDER BY id"
+            ).fetchall()
+            for row_id, raw in rows:
+                deliver(raw)
+                conn.execute(
+                    "UPDATE outbox SET sent_at = ? WHERE id = ?",
+                    (datetime.utcnow().isoformat(), row_id),
+                )
+                conn.commit()
+                sent += 1
+        return sent
+
+
+OUTBOXES = {
+    "sqlite": SQLiteOutbox,
+}
+
+
+def get_outbox() -> Outbox:
+    """Return the outbox configured by NOTIFY_OUTBOX / NOTIFY_OUTBOX_PATH."""
+    outbox = current_app.extensions.get("outbox")
+    if outbox is None:
+        outbox_cls = OUTBOXES[current_app.config.get("NOTIFY_OUTBOX", "sqlite")]
+        outbox = outbox_cls(current_app.config["NOTIFY_OUTBOX_PATH"])
+        current_app.extensions["outbox"] = outbox
+    return outbox
+
+
+def smtp_deliver(host: str = "localhost", port: int = 1025):
+    """Return a deliver callable for Outbox.drain() that sends over SMTP."""
+    def deliver(raw: str) -> None:
+        with smtplib.SMTP(host, port) as smtp:
+            smtp.send_message(message_from_string(raw))
+    return deliver
+
+
+# --- Digest job --------------------------------------------------------------
+
+def _render_digest(user: User, trips: dict) -> EmailMessage:
+    name = user.alias or user.email
+    lines = [f"Hi {name},", "", "Here is what happened on your trips:", ""]
+    for title, counts in trips.values():
+        parts = []
+        for kind, n in counts.items():
+            singular, plural = _KIND_LABELS[kind]
+            parts.append(f"{n} {singular if n == 1 else plural}")
+        lines.append(f"- {title}: {', '.join(parts)}")
+    lines += ["", "-- TravelTogether"]
+
+    msg = EmailMessage()
+    msg["From"] = current_app.config.get("NOTIFY_FROM", "noreply@traveltogether.local")
+    msg["To"] = user.email
+    msg["Subject"] = "TravelTogether: updates on your trips"
+    msg.set_content("\n".join(lines))
+    return msg
+
+
+@job_handler("send_digests")
+def send_digests(payload: dict) -> None:
+    """Coalesce pending events into one digest per participant."""
+    # Events recorded while this run is in progress are left for the next one
+    max_id = db.session.execute(db.select(db.func.max(NotificationEvent.id))).scalar()
+    if max_id is None:
+        return
+    pending = NotificationEvent.id <= max_id
+
+    # Fan out to participants and count per (user, trip, kind) in one query.
+    # Users are not notified about their own actions.
+    query = (
+        db.select(
+            Participation.user_id,
+            NotificationEvent.proposal_id,
+            NotificationEvent.kind,
+            db.func.count().label("n"),
+        )
+        .join(Participation, Participation.proposal_id == NotificationEvent.proposal_id)
+        .where(
+            pending,
+            db.or_(NotificationEvent.actor_id.is_(None), NotificationEvent.actor_id != Participation.user_id),
+        )
+        .group_by(Participation.user_id, NotificationEvent.proposal_id, NotificationEvent.kind)
+    )
+    rows = db.session.execute(query).all()
+
+    if rows:
+        user_ids = {r.user_id for r in rows}
+        proposal_ids = {r.proposal_id for r in rows}
+        users = {u.id: u for u in db.session.execute(
+            db.select(User).where(User.id.in_(user_ids))
+        ).scalars()}
+        titles = dict(db.session.execute(
+            db.select(TripProposal.id, TripProposal.title).where(TripProposal.id.in_(proposal_ids))
+        ).all())
+
+        per_user: dict[int, dict] = {}
+        for user_id, proposal_id, kind, n in rows:
+            trips = per_user.setdefault(user_id, {})
+            trips.setdefault(proposal_id, (titles.get(proposal_id, "A trip"), {}))[1][kind] = n
+
+        get_outbox().put([_render_digest(users[uid], trips) for uid, trips in per_user.items()])
+        current_app.logger.info(f"[notify] {len(per_user)} digests from events up to #{max_id}")
+
+    db.session.execute(
+        db.delete(NotificationEvent).where(pending).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
+from flask import (
+    Blueprint, render_template, redirect, url_for, request, flash, current_app, jsonify, abort,
+    stream_with_context,
+)
 from flask_login import login_required, current_user
 from datetime import datetime
 import re
 
+from sqlalchemy.orm.exc import StaleDataError
+
 from .models import (
     db,
     TripProposal,
@@ -10,21 +15,50 @@ from .models import (
     ProposalStatus,
     Message,
     Meetup,
+    NotificationEvent,
+    EventKind,
+)
+from .geocoding import apply_geocodes, get_geocoder, proposals_near
+from .autocomplete import get_autocomplete, index_locations
+from .duplicates import find_duplicates, index_proposal, unindex_proposal
+from .notifications import record_event
+from .unread import unread_counts, mark_read
+from .facets import parse_filters, compute_facets, DEFAULT_BUDGET_EDGES
+from .membership import Membership, membership_required, load_membership, invalidate_membership
+from .states import TRANSITIONS, InvalidTransition, can_transition, transition, bulk_transition
+from .queries import (
+    discovery_query,
+    user_participations_query,
+    meetups_query,
+    proposal_detail_query,
+    detail_messages_query,
+    message_stream_query,
+    message_ndjson,
 )
 
 # Blueprint
 proposals_bp = Blueprint("proposals", __name__)
 
 
-def get_participation(proposal: TripProposal):
-    """Return the participation object for the logged-in user (or None)."""
-    if not current_user.is_authenticated:
-        return None
-    query = db.select(Participation).where(
-        Participation.user_id == current_user.id,
-        Participation.proposal_id == proposal.id
-    )
-    return db.session.execute(query).scalar_one_or_none()
+def load_proposal_with_roster(proposal_id: int, user_id: int):
+    """
+    Load a proposal with its roster and their users eagerly (two queries) and
+    pick the user's participation from the roster. Returns (proposal, participation);
+    both are None if the proposal does not exist.
+    """
+    proposal = db.session.execute(proposal_detail_query(proposal_id)).scalar_one_or_none()
+    if proposal is None:
+        return None, None
+    participation = next((p for p in proposal.participations if p.user_id == user_id), None)
+    return proposal, participation
+
+
+def attach_participations(proposals: list[TripProposal], user_id: int) -> None:
+    """Set p.participation on each proposal for this user, using a single query."""
+    query = user_participations_query(user_id, [p.id for p in proposals])
+    by_proposal = {part.proposal_id: part for part in db.session.execute(query).scalars()}
+    for p in proposals:
+        p.participation = by_proposal.get(p.id)
 
 
 def _parse_meetup_datetime(req) -> datetime | None:
@@ -40,48 +74,170 @@ def _parse_meetup_datetime(req) -> datetime | None:
     return None
 
 
+# Editable proposal fields and their labels (see edit_proposal)
+EDIT_FIELDS = {
+    "title": "Title",
+    "departure_location": "Departure location",
+    "destination": "Destination",
+    "activities": "Activities",
+    "budget": "Budget",
+    "max_participants": "Max participants",
+    "start_date": "Start date",
+    "end_date": "End date",
+}
+
+
+def _parse_edit_form(form, prefix: str = "") -> dict:
+    """Parse the edit form fields (optionally the hidden `original_` copies) into column values."""
+    def text(field):
+        return form.get(prefix + field, "").strip()
+
+    def parse_date(value):
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+    return {
+        "title": text("title"),
+        "departure_location": text("departure_location") or None,
+        "destination": text("destination") or None,
+        "activities": text("activities") or None,
+        "budget": float(text("budget")) if text("budget") != "" else None,
+        "max_participants": int(text("max_participants")) if text("max_participants") else None,
+        "start_date": parse_date(text("start_date")),
+        "end_date": parse_date(text("end_date")),
+    }
+
+
+# Optional text columns: stored as '' by older code, parsed from the form as None
+_OPTIONAL_TEXT_FIELDS = ("departure_location", "destination", "activities")
+
+
+def _edit_values(proposal: TripProposal) -> dict:
+    """Current column values, normalized the way _parse_edit_form returns them."""
+    values = {field: getattr(proposal, field) for field in EDIT_FIELDS}
+    for field in _OPTIONAL_TEXT_FIELDS:
+        values[field] = values[field] or None
+    return values
+
+
+def _edit_form_strings(values: dict) -> dict:
+    """Format column values the way the edit form inputs expect them."""
+    def fmt(value):
+        if value is None:
+            return ""
+        if hasattr(value, "strftime"):
+            return value.strftime("%Y-%m-%d")
+        return str(value)
+
+    return {field: fmt(value) for field, value in values.items()}
+
+
+def _edit_conflict(proposal: TripProposal, original: dict, changed: dict):
+    """
+    Re-render the edit form with a 409 listing what the other editor changed.
+
+    The form holds the current values with this editor's changes on top and the
+    current version, so saving again applies them over the newer row.
+    """
+    current = _edit_values(proposal)
+    conflicts = [
+        {
+            "label": label,
+            "original": _edit_form_strings({field: original[field]})[field],
+            "theirs": _edit_form_strings({field: current[field]})[field],
+            "yours": _edit_form_strings({field: changed[field]})[field] if field in changed else None,
+        }
+        for field, label in EDIT_FIELDS.items()
+        if current[field] != original[field]
+    ]
+    flash("Another editor saved this proposal while you were editing. Review the changes below and save again.", "warning")
+    return render_template(
+        "proposal_edit.html",
+        proposal=proposal,
+        values=_edit_form_strings({**current, **changed}),
+        original=_edit_form_strings(current),
+        version=proposal.version,
+        conflicts=conflicts,
+    ), 409
+
+
 @proposals_bp.route("/proposals")
 @login_required
 def list_proposals():
-    # Only show open or closed_to_new_participants proposals for discovery
-    query = db.select(TripProposal).where(
-        TripProposal.status.in_([ProposalStatus.open, ProposalStatus.closed_to_new_participants])
-    ).order_by(TripProposal.start_date.is_(None), TripProposal.start_date.asc())
-    proposals = db.session.execute(query).scalars().all()
+    # Only show open or closed_to_new_participants proposals for discovery (unless filtered)
+    filters = parse_filters(request.args)
+    proposals = db.session.execute(discovery_query(filters)).scalars().all()
 
-    # Call get_participation for each proposal
-    for p in proposals:
-        p.participation = get_participation(p)
-    return render_template("proposals_list.html", proposals=proposals)
+    attach_participations(proposals, current_user.id)
+    return render_template("proposals_list.html", proposals=proposals, unread=unread_counts(current_user.id))
+
+
+@proposals_bp.route("/proposals/facets")
+@login_required
+def proposal_facets():
+    """Histogram buckets for the discovery filters, computed in one grouped query."""
+    filters = parse_filters(request.args)
+    budget_edges = current_app.config.get("FACET_BUDGET_EDGES", DEFAULT_BUDGET_EDGES)
+    return jsonify(compute_facets(filters, budget_edges))
+
+
+@proposals_bp.route("/proposals/near")
+@login_required
+def proposals_nearby():
+    """List open proposals leaving from / going to somewhere near a location."""
+    location = request.args.get("location", "").strip()
+    field = request.args.get("field", "departure")
+    if field not in ("departure", "destination"):
+        field = "departure"
+    try:
+        radius = min(max(float(request.args.get("radius", 50)), 1.0), 2000.0)
+    except ValueError:
+        radius = 50.0
+
+    coords = get_geocoder().resolve(location)
+    if not coords:
+        flash("Location not found in the gazetteer.", "warning")
+        return redirect(url_for("proposals.list_proposals"))
+
+    results = proposals_near(coords[0], coords[1], radius, field=field)
+    proposals = [p for p, _ in results]
+    attach_participations(proposals, current_user.id)
+    return render_template(
+        "proposals_list.html",
+        proposals=proposals,
+        distances={p.id: d for p, d in results},
+        near={"location": location, "radius": radius, "field": field},
+    )
+
+
+@proposals_bp.route("/proposals/autocomplete")
+@login_required
+def autocomplete_locations():
+    """Suggest departure / destination values already used on proposals: ?q=<prefix>&limit=<n>."""
+    prefix = request.args.get("q", "").strip()
+    limit = min(request.args.get("limit", 8, type=int), 10)
+    index = get_autocomplete()
+    suggestions = index.complete(prefix, limit) if prefix and index is not None else []
+    return jsonify({"suggestions": suggestions})
 
 
 @proposals_bp.route("/proposal/<int:proposal_id>")
 @login_required
 def proposal_detail(proposal_id: int):
-    proposal = db.session.get(TripProposal, proposal_id)
+    proposal, participation = load_proposal_with_roster(proposal_id, current_user.id)
     if not proposal:
         flash("Proposal not found.", "danger")
         return redirect(url_for("proposals.list_proposals"))
 
     # Require user to be a participant to view details
-    participation = get_participation(proposal)
     if not participation:
         flash("You are not a participant of this trip.", "danger")
         return redirect(url_for("proposals.list_proposals"))
 
-    # Messages - newest first
-    query_messages = db.select(Message).where(
-        Message.proposal_id == proposal.id
-    ).order_by(Message.timestamp.desc())
-    messages = db.session.execute(query_messages).scalars().all()
+    # Messages (newest first, authors joined) and meetups (NULL datetime last)
+    messages = db.session.execute(detail_messages_query(proposal.id)).scalars().all()
+    meetups = db.session.execute(meetups_query(proposal.id)).scalars().all()
 
-    # Meetups - NULL (unknown datetime) last
-    query_meetups = db.select(Meetup).where(
-        Meetup.proposal_id == proposal.id
-    ).order_by(Meetup.datetime.is_(None), Meetup.datetime.desc())
-    meetups = db.session.execute(query_meetups).scalars().all()
-
-    return render_template(
+    html = render_template(
         "proposal_detail.html",
         proposal=proposal,
         messages=messages,
@@ -90,13 +246,31 @@ def proposal_detail(proposal_id: int):
         ProposalStatus=ProposalStatus,  # Pass enum to template
     )
 
+    # Everything up to the newest message is now read. This commits, which expires
+    # the loaded objects, so it runs after rendering to avoid reloading them.
+    mark_read(participation, messages)
+    return html
+
+@proposals_bp.route("/proposal/<int:proposal_id>/messages.ndjson")
+@login_required
+@membership_required()
+def stream_messages(proposal_id: int, proposal: TripProposal, membership: Membership):
+    """Stream all messages of a trip as newline-delimited JSON, oldest first."""
+    query = message_stream_query(proposal_id).execution_options(stream_results=True, yield_per=500)
+
+    def generate():
+        for row in db.session.execute(query):
+            yield message_ndjson(row)
+
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 @proposals_bp.route("/proposal/<int:proposal_id>/join")
 @login_required
 def proposal_join(proposal_id: int):
-    proposal = TripProposal.query.get_or_404(proposal_id)
+    proposal, membership = load_membership(proposal_id, current_user.id)
     
     # already participating 
-    if get_participation(proposal):
+    if membership:
        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     
     # check if proposal is open to new participants
@@ -108,19 +282,21 @@ def proposal_join(proposal_id: int):
     if proposal.max_participants and len(proposal.participations) >= proposal.max_participants:
         flash("This trip is full.", "warning")
         # auto-close proposal
-        proposal.status = ProposalStatus.closed_to_new_participants
+        transition(proposal_id, "close")
         db.session.commit()
         return redirect(url_for("proposals.list_proposals"))
     
     # Add participation
     participation = Participation(user_id=current_user.id, proposal_id=proposal_id)
     db.session.add(participation)
+    record_event(proposal_id, EventKind.join, current_user.id)
 
     # close if full after joining
     if proposal.max_participants and len(proposal.participations) + 1 >= proposal.max_participants:
-        proposal.status = ProposalStatus.closed_to_new_participants
+        transition(proposal_id, "close")
 
     db.session.commit()
+    invalidate_membership(proposal_id, current_user.id)
      
     return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
@@ -144,8 +320,13 @@ def proposal_leave(proposal_id: int):
         Message.query.filter_by(proposal_id=proposal.id).delete()
         Meetup.query.filter_by(proposal_id=proposal.id).delete()
         Participation.query.filter_by(proposal_id=proposal.id).delete()
+        NotificationEvent.query.filter_by(proposal_id=proposal.id).delete()
+        locations = [proposal.departure_location, proposal.destination]
         db.session.delete(proposal)
         db.session.commit()
+        invalidate_membership(proposal_id)
+        index_locations(removed=locations)
+        unindex_proposal(proposal_id)
         flash("You were the last participant. The trip proposal has been deleted.", "success")
         return redirect(url_for("proposals.list_proposals"))
     
@@ -154,6 +335,7 @@ def proposal_leave(proposal_id: int):
     
     # Otherwise just remove this participant
     db.session.delete(participation)
+    record_event(proposal_id, EventKind.leave, current_user.id)
     db.session.commit()
     
     # If the leaving user had edit rights, check if there are other editors
@@ -172,15 +354,18 @@ def proposal_leave(proposal_id: int):
             if first_participant:
                 first_participant.can_edit = True
                 db.session.commit()
+                # Only now, so a request in between cannot re-cache them without edit rights
+                invalidate_membership(proposal_id)
                 flash(f"You left the trip. Edit rights were transferred to another participant.", "success")
                 return redirect(url_for("proposals.list_proposals"))
 
     # If trip was closed due to max participants, reopen if space available
     if proposal.status == ProposalStatus.closed_to_new_participants:
         if proposal.max_participants and len(proposal.participations) < proposal.max_participants:
-            proposal.status = ProposalStatus.open
+            transition(proposal_id, "reopen")
             db.session.commit()
 
+    invalidate_membership(proposal_id)
     flash("You left the trip.", "success")
     return redirect(url_for("proposals.list_proposals"))
 
@@ -233,6 +418,12 @@ def new_proposal():
             flash("Title is required.", "danger")
             return render_template("proposal_create_new.html")
 
+        # Offer to join a similar open trip instead, unless the user already chose to create
+        if not request.form.get("create_anyway"):
+            duplicates = find_duplicates(title, destination, start_date, end_date)
+            if duplicates:
+                return render_template("proposal_create_new.html", duplicates=duplicates)
+
         proposal = TripProposal(
             title=title,
             departure_location=departure_location,
@@ -249,6 +440,7 @@ def new_proposal():
             activities_are_final=False,
             creator_id=current_user.id,
         )
+        apply_geocodes(proposal)
         db.session.add(proposal)
         db.session.commit()
 
@@ -256,6 +448,8 @@ def new_proposal():
         part = Participation(user_id=current_user.id, proposal_id=proposal.id, can_edit=True)
         db.session.add(part)
         db.session.commit()
+        index_locations(added=[proposal.departure_location, proposal.destination])
+        index_proposal(proposal)
 
         flash("Trip proposal created successfully.", "success")
         return redirect(url_for("proposals.list_proposals"))
@@ -265,58 +459,76 @@ def new_proposal():
 
 @proposals_bp.route("/proposal/<int:proposal_id>/edit", methods=["GET", "POST"])
 @login_required
-def edit_proposal(proposal_id: int):
+@membership_required(editor=True, message="You don't have permission to edit this proposal.")
+def edit_proposal(proposal_id: int, proposal: TripProposal, membership: Membership):
     """Edit an existing proposal (only for users with edit permissions)"""
-    proposal = db.session.get(TripProposal, proposal_id)
-    if not proposal:
-        flash("Proposal not found.", "danger")
-        return redirect(url_for("proposals.list_proposals"))
-    
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You don't have permission to edit this proposal.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
-    
     if request.method == "POST":
-        # Update proposal fields
-        proposal.title = request.form.get("title", "").strip()
-        proposal.departure_location = request.form.get("departure_location", "").strip() or None
-        proposal.destination = request.form.get("destination", "").strip() or None
-        proposal.activities = request.form.get("activities", "").strip() or None
-        
-        budget_str = request.form.get("budget", "").strip()
-        proposal.budget = float(budget_str) if budget_str != "" else None
-        
-        max_participants_str = request.form.get("max_participants", "").strip()
-        proposal.max_participants = int(max_participants_str) if max_participants_str else None
-        
-        # Parse dates
-        start_date_str = request.form.get("start_date", "").strip()
-        proposal.start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date() if start_date_str else None
-        
-        end_date_str = request.form.get("end_date", "").strip()
-        proposal.end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date() if end_date_str else None
-        
-        db.session.commit()
+        try:
+            values = _parse_edit_form(request.form)
+            # What the editor saw when the form was rendered (the current row for old forms)
+            if "version" in request.form:
+                original = _parse_edit_form(request.form, prefix="original_")
+                version = int(request.form["version"])
+            else:
+                original, version = _edit_values(proposal), proposal.version
+        except ValueError:
+            abort(400)
+        changed = {f: v for f, v in values.items() if v != original[f]}
+
+        if version != proposal.version:
+            # Someone saved in the meantime; only overlapping fields are a conflict
+            theirs = {f for f, v in _edit_values(proposal).items() if v != original[f]}
+            if theirs & changed.keys():
+                return _edit_conflict(proposal, original, changed)
+
+        if not changed:
+            flash("No changes to save.", "info")
+            return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
+
+        # Only the changed columns (and the version counter) end up in the UPDATE
+        locations = [f for f in ("departure_location", "destination") if f in changed]
+        previous = [getattr(proposal, f) for f in locations]
+        for field, value in changed.items():
+            setattr(proposal, field, value)
+        if locations:
+            apply_geocodes(proposal)
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Another save landed between loading the row and this UPDATE
+            db.session.rollback()
+            current = db.session.get(TripProposal, proposal_id)
+            if current is None:
+                flash("This proposal was deleted while you were editing it.", "warning")
+                return redirect(url_for("proposals.list_proposals"))
+            return _edit_conflict(current, original, changed)
+        index_locations(added=[changed[f] for f in locations], removed=previous)
+        if changed.keys() & {"title", "destination", "start_date", "end_date"}:
+            index_proposal(proposal)
+
         flash("Proposal updated successfully.", "success")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     
-    return render_template("proposal_edit.html", proposal=proposal)
+    current = _edit_values(proposal)
+    return render_template(
+        "proposal_edit.html",
+        proposal=proposal,
+        values=_edit_form_strings(current),
+        original=_edit_form_strings(current),
+        version=proposal.version,
+        conflicts=[],
+    )
 
 
 @proposals_bp.route("/proposal/<int:proposal_id>/message", methods=["POST"])
 @login_required
-def post_message(proposal_id: int):
+@membership_required(message="You are not a participant of this trip.")
+def post_message(proposal_id: int, proposal: TripProposal, membership: Membership):
     body = (request.form.get("body") or "").strip()
     if not body:
         flash("Message cannot be empty.", "warning")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
-    proposal = TripProposal.query.get_or_404(proposal_id)
-    if not get_participation(proposal):
-        flash("You are not a participant of this trip.", "danger")
-        return redirect(url_for("proposals.list_proposals"))
-
     # Prevent posting messages on finalized or cancelled proposals
     if proposal.status in (ProposalStatus.finalized, ProposalStatus.cancelled):
         flash("This trip proposal is no longer accepting messages.", "warning")
@@ -324,6 +536,13 @@ def post_message(proposal_id: int):
 
     msg = Message(content=body, user_id=current_user.id, proposal_id=proposal_id)
     db.session.add(msg)
+    # Atomic increment in SQL; a bulk UPDATE so the counter does not bump the edit version
+    db.session.execute(
+        db.update(TripProposal)
+        .where(TripProposal.id == proposal_id)
+        .values(message_count=TripProposal.message_count + 1)
+    )
+    record_event(proposal_id, EventKind.message, current_user.id)
     db.session.commit()
     flash("Message posted!", "success")
     return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
@@ -331,7 +550,8 @@ def post_message(proposal_id: int):
 
 @proposals_bp.route("/proposal/<int:proposal_id>/meetup", methods=["POST"])
 @login_required
-def add_meetup(proposal_id: int):
+@membership_required(message="You are not a participant of this trip.")
+def add_meetup(proposal_id: int, proposal: TripProposal, membership: Membership):
     location = (request.form.get("location") or "").strip()
 
     dt = _parse_meetup_datetime(request)
@@ -343,11 +563,6 @@ def add_meetup(proposal_id: int):
         flash("Please provide a valid date and time (e.g. 2025-11-12 and 06:18).", "danger")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
-    proposal = TripProposal.query.get_or_404(proposal_id)
-    if not get_participation(proposal):
-        flash("You are not a participant of this trip.", "danger")
-        return redirect(url_for("proposals.list_proposals"))
-
     # Prevent adding meetups on finalized or cancelled proposals
     if proposal.status in (ProposalStatus.finalized, ProposalStatus.cancelled):
         flash("This trip proposal is no longer accepting changes.", "warning")
@@ -360,6 +575,7 @@ def add_meetup(proposal_id: int):
         creator_id=current_user.id,
     )
     db.session.add(meetup)
+    record_event(proposal_id, EventKind.meetup, current_user.id)
     db.session.commit()
 
     flash("Meetup added!", "success")
@@ -368,20 +584,16 @@ def add_meetup(proposal_id: int):
 
 @proposals_bp.route("/proposal/<int:proposal_id>/finalize", methods=["POST"])
 @login_required
-def finalize_proposal(proposal_id: int):
+@membership_required(editor=True, message="You do not have permission to finalize this proposal.")
+def finalize_proposal(proposal_id: int, proposal: TripProposal, membership: Membership):
     """Finalize a proposal - make it read-only and no longer discoverable."""
-    proposal = TripProposal.query.get_or_404(proposal_id)
-
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You do not have permission to finalize this proposal.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
-
-    if proposal.status in (ProposalStatus.finalized, ProposalStatus.cancelled):
+    if not can_transition(proposal.status, "finalize"):
         flash("This proposal has already been finalized or cancelled.", "warning")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
-    proposal.status = ProposalStatus.finalized
+    if not transition(proposal_id, "finalize"):
+        flash("The status of this proposal changed in the meantime. Please try again.", "warning")
+        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     db.session.commit()
 
     flash("Proposal finalized successfully. It is now read-only.", "success")
@@ -390,20 +602,16 @@ def finalize_proposal(proposal_id: int):
 
 @proposals_bp.route("/proposal/<int:proposal_id>/cancel", methods=["POST"])
 @login_required
-def cancel_proposal(proposal_id: int):
+@membership_required(editor=True, message="You do not have permission to cancel this proposal.")
+def cancel_proposal(proposal_id: int, proposal: TripProposal, membership: Membership):
     """Cancel a proposal - make it read-only and no longer discoverable."""
-    proposal = TripProposal.query.get_or_404(proposal_id)
-
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You do not have permission to cancel this proposal.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
-
-    if proposal.status in (ProposalStatus.finalized, ProposalStatus.cancelled):
+    if not can_transition(proposal.status, "cancel"):
         flash("This proposal has already been finalized or cancelled.", "warning")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
-    proposal.status = ProposalStatus.cancelled
+    if not transition(proposal_id, "cancel"):
+        flash("The status of this proposal changed in the meantime. Please try again.", "warning")
+        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     db.session.commit()
 
     flash("Proposal cancelled successfully. It is now read-only.", "success")
@@ -412,20 +620,16 @@ def cancel_proposal(proposal_id: int):
 
 @proposals_bp.route("/proposal/<int:proposal_id>/close-to-new-participants", methods=["POST"])
 @login_required
-def close_to_new_participants_proposal(proposal_id: int):
+@membership_required(editor=True, message="You do not have permission to close this proposal to new participants.")
+def close_to_new_participants_proposal(proposal_id: int, proposal: TripProposal, membership: Membership):
     """Close a proposal to new participants - no new joins allowed but other functionality continues."""
-    proposal = TripProposal.query.get_or_404(proposal_id)
-
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You do not have permission to close this proposal to new participants.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
-
-    if proposal.status != ProposalStatus.open:
+    if not can_transition(proposal.status, "close"):
         flash("This proposal is not open to new participants.", "warning")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
-    proposal.status = ProposalStatus.closed_to_new_participants
+    if not transition(proposal_id, "close"):
+        flash("The status of this proposal changed in the meantime. Please try again.", "warning")
+        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     db.session.commit()
 
     flash("Proposal closed to new participants. Existing functionality remains available.", "success")
@@ -434,34 +638,59 @@ def close_to_new_participants_proposal(proposal_id: int):
 
 @proposals_bp.route("/proposal/<int:proposal_id>/reopen", methods=["POST"])
 @login_required
-def reopen_proposal(proposal_id: int):
+@membership_required(editor=True, message="You do not have permission to reopen this proposal.")
+def reopen_proposal(proposal_id: int, proposal: TripProposal, membership: Membership):
     """Reopen a proposal that was closed to new participants."""
-    proposal = TripProposal.query.get_or_404(proposal_id)
-
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You do not have permission to reopen this proposal.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
-
-    if proposal.status != ProposalStatus.closed_to_new_participants:
+    if not can_transition(proposal.status, "reopen"):
         flash("This proposal is not closed to new participants.", "warning")
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
-    proposal.status = ProposalStatus.open
+    if not transition(proposal_id, "reopen"):
+        flash("The status of this proposal changed in the meantime. Please try again.", "warning")
+        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     db.session.commit()
 
     flash("Proposal reopened to new participants.", "success")
     return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
 
+@proposals_bp.route("/proposals/bulk/<action>", methods=["POST"])
+@login_required
+def bulk_transition_proposals(action: str):
+    """
+    Apply one status transition (finalize, cancel, close, reopen) to many proposals.
+
+    Proposal ids come from repeated `proposal_id` form fields or a comma-separated
+    `proposal_ids` field. Returns a JSON result per id.
+    """
+    if action not in TRANSITIONS:
+        return jsonify({"error": f"Unknown action '{action}'."}), 400
+
+    raw_ids = request.form.getlist("proposal_id")
+    raw_ids += [i for i in request.form.get("proposal_ids", "").split(",") if i.strip()]
+    try:
+        proposal_ids = [int(i) for i in raw_ids]
+    except ValueError:
+        return jsonify({"error": "Proposal ids must be integers."}), 400
+    if not proposal_ids:
+        return jsonify({"error": "No proposal ids given."}), 400
+
+    try:
+        results = bulk_transition(action, proposal_ids, current_user)
+    except InvalidTransition as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "action": action,
+        "updated": sum(1 for r in results.values() if r == "ok"),
+        "results": {str(pid): r for pid, r in results.items()},
+    })
+
+
 @proposals_bp.route("/proposal/<int:proposal_id>/grant-edit/<int:user_id>", methods=["POST"])
 @login_required
-def grant_edit_permission(proposal_id: int, user_id: int):
-    proposal = TripProposal.query.get_or_404(proposal_id)
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You do not have permission to grant edit rights.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
+@membership_required(editor=True, message="You do not have permission to grant edit rights.")
+def grant_edit_permission(proposal_id: int, user_id: int, proposal: TripProposal, membership: Membership):
     target = Participation.query.filter_by(proposal_id=proposal_id, user_id=user_id).first()
     if not target:
         flash("User is not a participant.", "danger")
@@ -471,27 +700,27 @@ def grant_edit_permission(proposal_id: int, user_id: int):
         return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
     target.can_edit = True
     db.session.commit()
+    invalidate_membership(proposal_id, user_id)
     flash("Edit rights granted.", "success")
     return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
 
 @proposals_bp.route("/proposal/<int:proposal_id>/delete", methods=["POST"])
 @login_required
-def delete_proposal(proposal_id: int):
+@membership_required(editor=True, message="You do not have permission to delete this proposal.")
+def delete_proposal(proposal_id: int, proposal: TripProposal, membership: Membership):
     """Delete a proposal (only for users with can_edit permission)."""
-    proposal = TripProposal.query.get_or_404(proposal_id)
-
-    participation = get_participation(proposal)
-    if not participation or not participation.can_edit:
-        flash("You do not have permission to delete this proposal.", "danger")
-        return redirect(url_for("proposals.proposal_detail", proposal_id=proposal_id))
-
     # Clean up related rows to avoid FK errors (since there's no relationship-cascade for Participation)
     Message.query.filter_by(proposal_id=proposal.id).delete()
     Meetup.query.filter_by(proposal_id=proposal.id).delete()
     Participation.query.filter_by(proposal_id=proposal.id).delete()
+    NotificationEvent.query.filter_by(proposal_id=proposal.id).delete()
 
+    locations = [proposal.departure_location, proposal.destination]
     db.session.delete(proposal)
     db.session.commit()
+    invalidate_membership(proposal_id)
+    index_locations(removed=locations)
+    unindex_proposal(proposal_id)
 
     flash("Proposal deleted successfully.", "success")
     return redirect(url_for("proposals.list_proposals"))
@@ -0,0 +1,98 @@
+"""
+Query builders shared by the sync (WSGI) routes and the async (ASGI) routes.
+
+Each function returns a SQLAlchemy Select; the caller executes it with either
+db.session (sync) or an AsyncSession (see aio.py).
+"""
+import json
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models import db, TripProposal, Participation, Message, Meetup, User
+from .facets import filter_conditions
+
+
+def discovery_query(filters: dict):
+    """Proposals for the discovery list, NULL start dates last."""
+    return db.select(TripProposal).where(
+        *filter_conditions(filters)
+    ).order_by(TripProposal.start_date.is_(None), TripProposal.start_date.asc())
+
+
+def participation_query(user_id: int, proposal_id: int):
+    """The participation of one user on one proposal."""
+    return db.select(Participation).where(
+        Participation.user_id == user_id,
+        Participation.proposal_id == proposal_id
+    )
+
+
+def proposal_membership_query(proposal_id: int, user_id: int):
+    """A proposal and one user's participation on it (None if not a participant), in one query."""
+    return db.select(TripProposal, Participation).outerjoin(
+        Participation,
+        db.and_(Participation.proposal_id == TripProposal.id, Participation.user_id == user_id),
+    ).where(TripProposal.id == proposal_id)
+
+
+def user_participations_query(user_id: int, proposal_ids):
+    """A user's participations on a set of proposals (one query instead of one per proposal)."""
+    return db.select(Participation).where(
+        Participation.user_id == user_id,
+        Participation.proposal_id.in_(proposal_ids)
+    )
+
+
+def messages_query(proposal_id: int, newest_first: bool = True):
+    """Messages on a proposal, newest first by default."""
+    if newest_first:
+        order = (Message.timestamp.desc(), Message.id.desc())
+    else:
+        order = (Message.timestamp.asc(), Message.id.asc())
+    return db.select(Message).where(Message.proposal_id == proposal_id).order_by(*order)
+
+
+def proposal_detail_query(proposal_id: int):
+    """A proposal with its roster and the roster's users (one query each: proposal, participations + users)."""
+    return db.select(TripProposal).where(TripProposal.id == proposal_id).options(
+        selectinload(TripProposal.participations).joinedload(Participation.user)
+    )
+
+
+def detail_messages_query(proposal_id: int):
+    """Messages on a proposal, newest first, with their authors joined in."""
+    return messages_query(proposal_id).options(joinedload(Message.author))
+
+
+def meetups_query(proposal_id: int):
+    """Meetups on a proposal, NULL (unknown datetime) last."""
+    return db.select(Meetup).where(
+        Meetup.proposal_id == proposal_id
+    ).order_by(Meetup.datetime.is_(None), Meetup.datetime.desc())
+
+
+def message_stream_query(proposal_id: int):
+    """Flat message rows (with author name) for streaming, oldest first."""
+    return (
+        db.select(
+            Message.id,
+            Message.timestamp,
+            Message.user_id,
+            db.func.coalesce(User.alias, User.email).label("author"),
+            Message.content,
+        )
+        .outerjoin(User, User.id == Message.user_id)
+        .where(Message.proposal_id == proposal_id)
+        .order_by(Message.timestamp.asc(), Message.id.asc())
+    )
+
+
+def message_ndjson(row) -> str:
+    """One line of the NDJSON message stream."""
+    return json.dumps({
+        "id": row.id,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "user_id": row.user_id,
+        "author": row.author,
+        "content": row.content,
+    }, ensure_ascii=False) + "\n"
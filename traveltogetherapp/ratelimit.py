@@ -0,0 +1,217 @@
+"""
+Per-endpoint rate limits for writes and joins.
+
+RATE_LIMITS maps an endpoint to per-user and / or per-IP limits of
+(requests, window seconds). A before_request hook counts each request in a
+sliding window and rejects it with 429 and Retry-After once the limit is
+reached; endpoints without limits cost one dict lookup.
+
+The window is a sliding-window counter: the count of the current fixed window
+plus the previous window's count weighted by how much of it still overlaps the
+sliding window. That needs three numbers per key, so it works the same in
+memory and in a shared store.
+
+A request is counted only if every limit of its endpoint allows it, so
+requests rejected by the per-user limit do not use up the per-IP quota.
+
+The default store is in-process memory (per worker). The "sqlite" store keeps
+the counters in a standalone SQLite file shared by all workers on the host,
+and stands in for a network store when testing multi-worker setups.
+
+Per-IP limits use request.remote_addr. Behind a reverse proxy that is the
+proxy's address, so set PROXY_FIX_X_FOR to the number of proxies in front of
+the app; otherwise every client shares one IP quota.
+"""
+import math
+import sqlite3
+import threading
+import time
+
+from flask import current_app, request
+from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+
+
+def sliding_window(prev: int, curr: int, elapsed: float, window: float, limit: int) -> tuple[bool, float]:
+    """
+    Decide one request given the previous and current fixed-window counts and
+    the time elapsed in the current window. Returns (allowed, retry_after seconds).
+    """
+    weight = 1 - elapsed / window
+    if prev * weight + curr + 1 <= limit:
+        return True, 0.0
+    if curr + 1 <= limit:
+        # Allowed again later in this window, once enough of the previous one has slid out
+        return False, window * (1 - (limit - 1 - curr) / prev) - elapsed
+    # Not before the next window: then the current count becomes the weighted one
+    wait = window - elapsed
+    if curr > 0:
+        wait += max(0.0, window * (1 - (limit - 1) / curr))
+    return False, wait
+
+
+class RateLimitStore:
+    """Counter storage. Subclasses implement hit()."""
+
+    def hit(self, limits: list[tuple[str, int, int]]) -> tuple[bool, float]:
+        """
+        Check one request against (key, limit, window) triples and count it under
+        every key only if all of them allow it. Returns (allowed, retry_after).
+        """
+        raise NotImplementedError
+
+
+def _decide(counts: list[tuple[int, int, float, int, int]]) -> tuple[bool, float]:
+    """Combine sliding_window() over (prev, curr, elapsed, window, limit) per key."""
+    allowed, retry_after = True, 0.0
+    for prev, curr, elapsed, window, limit in counts:
+        ok, wait = sliding_window(prev, curr, elapsed, window, limit)
+        if not ok:
+            allowed, retry_after = False, max(retry_after, wait)
+    return allowed, retry_after
+
+
+class MemoryStore(RateLimitStore):
+    """Counters in a dict, per process."""
+
+    SWEEP_EVERY = 10000
+
+    def __init__(self, path: str | None = None):
+        self._counters: dict[str, list] = {}   # key -> [window index, prev, curr]
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def hit(self, limits: list[tuple[str, int, int]]) -> tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            counters, counts = [], []
+            for key, limit, window in limits:
+                index = int(now // window)
+                counter = self._counters.get(key)
+                if counter is None:
+                    counter = self._counters[key] = [index, 0, 0]
+                elif counter[0] != index:
+                    counter[1] = counter[2] if counter[0] == index - 1 else 0
+                    counter[0], counter[2] = index, 0
+                counters.append(counter)
+                counts.append((counter[1], counter[2], now - index * window, window, limit))
+            allowed, retry_after = _decide(counts)
+            if allowed:
+                for counter in counters:
+                    counter[2] += 1
+
+            self._hits += 1
+            if self._hits % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+        return allowed, retry_after
+
+    def _sweep(self, now: float) -> None:
+        """Drop keys idle for a whole window (their previous count no longer matters)."""
+        for key, counter in list(self._counters.items()):
+            window = key.rsplit(":", 1)[-1]
+            if counter[0] < int(now // int(window)) - 1:
+                del self._counters[key]
+
+
+class SQLiteStore(RateLimitStore):
+    """Counters in a standalone SQLite file shared by all workers on the host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                " key TEXT PRIMARY KEY,"
+                " window INTEGER NOT NULL,"
+                " prev INTEGER NOT NULL,"
+                " curr INTEGER NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, limits: list[tuple[str, int, int]]) -> tuple[bool, float]:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows, counts = [], []
+            for key, limit, window in limits:
+                index = int(now // window)
+                row = conn.execute("SELECT window, prev, curr FROM rate_limit WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    prev, curr = 0, 0
+                elif row[0] != index:
+                    prev, curr = (row[2] if row[0] == index - 1 else 0), 0
+                else:
+                    prev, curr = row[1], row[2]
+                rows.append((key, index, prev, curr))
+                counts.append((prev, curr, now - index * window, window, limit))
+            allowed, retry_after = _decide(counts)
+            conn.executemany(
+                "INSERT INTO rate_limit (key, window, prev, curr) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET window = excluded.window, prev = excluded.prev, curr = excluded.curr",
+                [(key, index, prev, curr + 1 if allowed else curr) for key, index, prev, curr in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+STORES = {
+    "memory": MemoryStore,
+    "sqlite": SQLiteStore,
+}
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    """Return the store configured by RATE_LIMIT_STORE / RATE_LIMIT_STORE_PATH."""
+    store = current_app.extensions.get("rate_limit_store")
+    if store is None:
+        store_cls = STORES[current_app.config.get("RATE_LIMIT_STORE", "memory")]
+        store = store_cls(current_app.config.get("RATE_LIMIT_STORE_PATH"))
+        current_app.extensions["rate_limit_store"] = store
+    return store
+
+
+def check_rate_limits():
+    """before_request hook: raise 429 if the request exceeds one of its endpoint's limits."""
+    rules = current_app.config["RATE_LIMITS"].get(request.endpoint)
+    if rules is None:
+        return None
+    methods = rules.get("methods")
+    if methods and request.method not in methods:
+        return None
+
+    limits = []
+    for scope in ("ip", "user"):
+        if scope not in rules:
+            continue
+        if scope == "ip":
+            who = request.remote_addr or "unknown"
+        elif current_user.is_authenticated:
+            who = current_user.get_id()
+        else:
+            continue
+        limit, window = rules[scope]
+        limits.append((f"{request.endpoint}:{scope}:{who}:{window}", limit, window))
+    if not limits:
+        return None
+
+    allowed, retry_after = get_rate_limit_store().hit(limits)
+    if not allowed:
+        raise TooManyRequests(retry_after=max(1, math.ceil(retry_after)))
+    return None
+
+
+def init_rate_limits(app) -> None:
+    app.before_request(check_rate_limits)
@@ -0,0 +1,161 @@
+"""
+Slow-query log.
+
+Engine event hooks time every statement. Statements slower than
+SLOW_QUERY_THRESHOLD_MS are written as one JSON object per line to a rotating
+file, with the Flask endpoint that issued them, the shape (not the values) of
+their parameters, a normalized fingerprint for grouping, and the EXPLAIN output
+for the statement. `flask --app app slow-queries` prints the top offenders.
+"""
+import glob
+import hashlib
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger("traveltogether.slowquery")
+
+_EXPLAINABLE = ("select", "update", "delete", "insert")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Replace literals and placeholders with ? and collapse IN lists and whitespace."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:12]
+
+
+def _shape(params):
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(v).__name__ for v in params]
+    return type(params).__name__
+
+
+def param_shape(parameters, executemany: bool):
+    """Describe parameters by type only, so no user data ends up in the log."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": _shape(rows[0]) if rows else None}
+    return _shape(parameters)
+
+
+def _explain(conn, statement: str, parameters) -> list | str | None:
+    """Run EXPLAIN for a statement on a fresh DBAPI cursor of the same connection."""
+    if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [[str(col) for col in row] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {type(e).__name__}: {e}"
+
+
+def attach(engine, threshold_ms: float, explain: bool = True) -> None:
+    """Install the timing hooks on an engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slowlog_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["slowlog_start"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < threshold_ms:
+            return
+
+        record = {
+            "ts": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+            "duration_ms": round(duration_ms, 2),
+            "endpoint": request.endpoint if has_request_context() else None,
+            "fingerprint": fingerprint(statement),
+            "statement": normalize_statement(statement),
+            "params": param_shape(parameters, executemany),
+        }
+        # A streaming (unbuffered) cursor still owns the connection, so no EXPLAIN then
+        if explain and not executemany and not context.execution_options.get("stream_results"):
+            record["explain"] = _explain(conn, statement, parameters)
+        logger.info(json.dumps(record, default=str))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # after_cursor_execute does not run for a failed statement
+        starts = context.connection.info.get("slowlog_start") if context.connection is not None else None
+        if starts and context.execution_context is not None:
+            starts.pop()
+
+
+def init_slow_query_log(app, engine) -> None:
+    """Configure the rotating JSONL log file and hook the app's engine."""
+    if not logger.handlers:
+        handler = RotatingFileHandler(
+            app.config["SLOW_QUERY_LOG_PATH"],
+            maxBytes=app.config.get("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024),
+            backupCount=app.config.get("SLOW_QUERY_LOG_BACKUPS", 5),
+            encoding="utf-8",
+            delay=True,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    attach(
+        engine,
+        app.config.get("SLOW_QUERY_THRESHOLD_MS", 200),
+        explain=app.config.get("SLOW_QUERY_EXPLAIN", True),
+    )
+
+
+def top_offenders(path: str, limit: int = 10, sort: str = "total") -> list[dict]:
+    """Aggregate the log (including rotated files) by fingerprint."""
+    groups: dict[str, dict] = {}
+    for filename in sorted(glob.glob(path + "*")):
+        with open(filename, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                g = groups.setdefault(record["fingerprint"], {
+                    "fingerprint": record["fingerprint"],
+                    "statement": record["statement"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "endpoints": set(),
+                    "explain": record.get("explain"),
+                })
+                g["count"] += 1
+                g["total_ms"] += record["duration_ms"]
+                g["max_ms"] = max(g["max_ms"], record["duration_ms"])
+                if record.get("endpoint"):
+                    g["endpoints"].add(record["endpoint"])
+
+    key = {"total": "total_ms", "max": "max_ms", "count": "count"}[sort]
+    return sorted(groups.values(), key=lambda g: g[key], reverse=True)[:limit]
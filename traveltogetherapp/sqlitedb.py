@@ -0,0 +1,112 @@
+"""
+Embedded SQLite mode for single-node installs (DB_BACKEND=sqlite).
+
+Every new connection gets the SQLITE_* pragmas: WAL journaling (readers never
+block the writer or each other), synchronous=NORMAL (durable at checkpoints,
+no fsync per commit), a memory-mapped read path, a larger page cache, foreign
+keys enforced as on MySQL, and a busy timeout so concurrent writers wait for
+the write lock instead of failing with "database is locked". The driver only
+opens a transaction at the first INSERT / UPDATE / DELETE, so a transaction
+never has to upgrade a stale read snapshot and the busy timeout always applies.
+
+Backups use the SQLite online backup API on a separate connection: in WAL mode
+the copy is a consistent snapshot and writers carry on while it runs. The
+`backup_sqlite` job takes one every SQLITE_BACKUP_INTERVAL seconds when the
+job runner is enabled; `flask --app app backup-db` takes one on demand (or
+from cron at a fixed time).
+"""
+import glob
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+BACKUP_PREFIX = "traveltogether-"
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def database_path(uri: str) -> str | None:
+    """Path of the database file, or None for an in-memory database."""
+    database = make_url(uri).database
+    if not database or database == ":memory:":
+        return None
+    return os.path.abspath(database)
+
+
+def pragmas(config) -> list[tuple[str, object]]:
+    return [
+        ("journal_mode", "WAL"),
+        ("synchronous", config.get("SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("mmap_size", config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        ("cache_size", config.get("SQLITE_CACHE_SIZE", -64 * 1024)),
+        ("busy_timeout", config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        ("foreign_keys", "ON"),
+    ]
+
+
+def attach(engine, config) -> None:
+    """Set the pragmas on every new connection of a (sync or async) engine."""
+    settings = pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def init_sqlite(app, engine) -> None:
+    """Create the database directory and tune the app's engine."""
+    path = database_path(app.config["SQLALCHEMY_DATABASE_URI"])
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    attach(engine, app.config)
+
+
+def backup_database(destination: str | None = None) -> str:
+    """
+    Copy the live database to `destination` (default: a timestamped file in
+    SQLITE_BACKUP_DIR, pruned to the newest SQLITE_BACKUP_KEEP) and return its path.
+    """
+    config = current_app.config
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    source_path = database_path(uri) if is_sqlite(uri) else None
+    if source_path is None:
+        raise ValueError("Backups need a file-based SQLite database (DB_BACKEND=sqlite).")
+    if not os.path.exists(source_path):
+        raise ValueError(f"Database {source_path} does not exist.")
+
+    rotate = destination is None
+    if rotate:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        destination = os.path.join(config["SQLITE_BACKUP_DIR"], f"{BACKUP_PREFIX}{stamp}.db")
+    destination = os.path.abspath(destination)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+
+    # Copy into a temporary file so a failed backup never replaces a good one
+    partial = destination + ".partial"
+    started = time.perf_counter()
+    source = sqlite3.connect(source_path, timeout=config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000)
+    target = sqlite3.connect(partial)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    os.replace(partial, destination)
+    current_app.logger.info(f"[sqlite] backup {destination} in {time.perf_counter() - started:.2f} s")
+
+    if rotate:
+        keep = config.get("SQLITE_BACKUP_KEEP", 7)
+        backups = sorted(glob.glob(os.path.join(config["SQLITE_BACKUP_DIR"], f"{BACKUP_PREFIX}*.db")))
+        for old in backups[:-keep] if keep > 0 else []:
+            os.remove(old)
+    return destination
@@ -0,0 +1,119 @@
+"""
+Proposal state machine.
+
+All status changes requested by users go through TRANSITIONS, both for single
+proposals (the finalize / cancel / close / reopen routes) and for bulk
+moderation, where one transition is applied to many proposals with a single
+set-based UPDATE.
+"""
+from .models import db, TripProposal, Participation, ProposalStatus, User
+
+# action -> (allowed source statuses, target status)
+TRANSITIONS = {
+    "finalize": (
+        {ProposalStatus.open, ProposalStatus.closed_to_new_participants},
+        ProposalStatus.finalized,
+    ),
+    "cancel": (
+        {ProposalStatus.open, ProposalStatus.closed_to_new_participants},
+        ProposalStatus.cancelled,
+    ),
+    "close": ({ProposalStatus.open}, ProposalStatus.closed_to_new_participants),
+    "reopen": ({ProposalStatus.closed_to_new_participants}, ProposalStatus.open),
+}
+
+# Per-id results of bulk_transition
+OK = "ok"
+NOT_FOUND = "not_found"
+FORBIDDEN = "forbidden"
+INVALID_STATE = "invalid_state"
+CONFLICT = "conflict"
+
+
+class InvalidTransition(ValueError):
+    """The requested action is unknown or not allowed from the current status."""
+
+
+def can_transition(status: ProposalStatus, action: str) -> bool:
+    sources, _ = TRANSITIONS[action]
+    return status in sources
+
+
+def transition(proposal_id: int, action: str) -> bool:
+    """
+    Change a single proposal's status (not committed) with a conditional UPDATE.
+    Returns False if the proposal is no longer in an allowed source status.
+    Raises InvalidTransition.
+
+    Like message_count, status is not an edit form field, so it is written
+    without bumping the edit version: a status change never makes a concurrent
+    edit fail, and the edit's versioned UPDATE never overwrites the status.
+    """
+    if action not in TRANSITIONS:
+        raise InvalidTransition(f"Unknown action '{action}'.")
+    sources, target = TRANSITIONS[action]
+    result = db.session.execute(
+        db.update(TripProposal)
+        .where(TripProposal.id == proposal_id, TripProposal.status.in_(sources))
+        .values(status=target)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def bulk_transition(action: str, proposal_ids, user: User) -> dict[int, str]:
+    """
+    Apply one transition to many proposals in a single transaction.
+
+    Only proposals the user may edit (or all, for moderators) in an allowed
+    source status are updated, with one UPDATE ... WHERE id IN (...). Returns a
+    result per requested id: ok, not_found, forbidden, invalid_state or conflict
+    (the status changed between the check and the update).
+    """
+    if action not in TRANSITIONS:
+        raise InvalidTransition(f"Unknown action '{action}'.")
+    sources, target = TRANSITIONS[action]
+    ids = sorted({int(i) for i in proposal_ids})
+    if not ids:
+        return {}
+
+    is_editor = db.exists().where(
+        Participation.proposal_id == TripProposal.id,
+        Participation.user_id == user.id,
+        Participation.can_edit.is_(True),
+    )
+    permitted = db.true() if getattr(user, "is_moderator", False) else is_editor
+
+    # Classify every id in one query
+    rows = db.session.execute(
+        db.select(TripProposal.id, TripProposal.status, permitted.label("permitted"))
+        .where(TripProposal.id.in_(ids))
+    ).all()
+    results = {i: NOT_FOUND for i in ids}
+    eligible = []
+    for proposal_id, status, allowed in rows:
+        if not allowed:
+            results[proposal_id] = FORBIDDEN
+        elif status not in sources:
+            results[proposal_id] = INVALID_STATE
+        else:
+            eligible.append(proposal_id)
+
+    if eligible:
+        # The conditions are repeated so a concurrent change cannot be overwritten
+        result = db.session.execute(
+            db.update(TripProposal)
+            .where(TripProposal.id.in_(eligible), TripProposal.status.in_(sources), permitted)
+            .values(status=target)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount == len(eligible):
+            results.update({i: OK for i in eligible})
+        else:
+            updated = set(db.session.execute(
+                db.select(TripProposal.id).where(TripProposal.id.in_(eligible), TripProposal.status == target)
+            ).scalars())
+            results.update({i: OK if i in updated else CONFLICT for i in eligible})
+
+    db.session.commit()
+    return results
@@ -0,0 +1,285 @@
+"""
+Streaming export and import of trip data (proposals, roster, messages, meetups).
+
+Exports read each table through a server-side cursor (stream_results /
+yield_per) and write records as they arrive, so memory use does not grow with
+the size of the database. Every record carries a "type" field; CSV exports use
+the union of all fields as header.
+
+Imports read records one at a time, validate them, and insert them in batches
+with executemany. Ids are kept, so an export can be loaded into an empty
+database (e.g. to seed staging); referenced users must already exist.
+Proposal, participation, message and meetup ids must not be taken yet.
+"""
+import csv
+import json
+import time
+from datetime import date, datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, TripProposal, Participation, Message, Meetup, ProposalStatus, User
+
+STREAM_BATCH = 1000
+
+# Record type -> (model, exported fields)
+RECORD_TYPES = {
+    "proposal": (TripProposal, [
+        "id", "title", "departure_location", "destination", "budget", "max_participants",
+        "start_date", "end_date", "activities", "departure_location_is_final",
+        "destination_is_final", "budget_is_final", "dates_are_final", "activities_are_final",
+        "status", "creator_id",
+    ]),
+    "participation": (Participation, ["id", "proposal_id", "user_id", "can_edit"]),
+    "message": (Message, ["id", "proposal_id", "user_id", "timestamp", "content"]),
+    "meetup": (Meetup, ["id", "proposal_id", "creator_id", "location", "datetime"]),
+}
+
+# Export-only roster details (ignored on import)
+ROSTER_FIELDS = ["user_email", "user_alias"]
+
+CSV_FIELDS = ["type"] + list(dict.fromkeys(
+    [f for _, fields in RECORD_TYPES.values() for f in fields] + ROSTER_FIELDS
+))
+
+# Field types used when validating imports (fields not listed are plain strings)
+_INT_FIELDS = {"id", "proposal_id", "user_id", "creator_id", "max_participants"}
+_BOOL_FIELDS = {
+    "can_edit", "departure_location_is_final", "destination_is_final",
+    "budget_is_final", "dates_are_final", "activities_are_final",
+}
+_REQUIRED = {
+    "proposal": {"id", "title", "creator_id"},
+    "participation": {"id", "proposal_id", "user_id"},
+    "message": {"id", "proposal_id", "user_id"},
+    "meetup": {"id", "proposal_id"},
+}
+
+
+class RecordError(ValueError):
+    """An import record failed validation."""
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, ProposalStatus):
+        return value.name
+    return value
+
+
+# --- Export ------------------------------------------------------------------
+
+def iter_records(proposal_id: int | None = None):
+    """Yield export records (dicts) for one proposal or all of them, streaming each table."""
+    for record_type, (model, fields) in RECORD_TYPES.items():
+        columns = [getattr(model, f) for f in fields]
+        if record_type == "participation":
+            columns += [User.email.label("user_email"), User.alias.label("user_alias")]
+        query = db.select(*columns).order_by(model.id)
+        if record_type == "participation":
+            query = query.join(User, User.id == Participation.user_id)
+
+        key = model.id if model is TripProposal else model.proposal_id
+        if proposal_id is not None:
+            query = query.where(key == proposal_id)
+
+        result = db.session.execute(query.execution_options(stream_results=True, yield_per=STREAM_BATCH))
+        for row in result:
+            record = {"type": record_type}
+            record.update({k: _to_json(v) for k, v in row._mapping.items()})
+            yield record
+
+
+def write_records(records, out, fmt: str = "jsonl") -> int:
+    """Write records to a text stream as JSONL or CSV and return how many were written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write("\n")
+            count += 1
+    return count
+
+
+# --- Import ------------------------------------------------------------------
+
+def read_records(stream, fmt: str = "jsonl"):
+    """Yield (line_number, record) from a JSONL or CSV text stream."""
+    if fmt == "csv":
+        for line_no, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, {k: (v if v != "" else None) for k, v in row.items()}
+    else:
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, RecordError(f"invalid JSON: {e}")
+
+
+def validate_record(record: dict) -> tuple[str, dict]:
+    """Check and coerce one record. Returns (record type, column values)."""
+    record_type = record.get("type")
+    if record_type not in RECORD_TYPES:
+        raise RecordError(f"unknown record type {record_type!r}")
+    _, fields = RECORD_TYPES[record_type]
+
+    missing = [f for f in _REQUIRED[record_type] if record.get(f) in (None, "")]
+    if missing:
+        raise RecordError(f"{record_type}: missing {', '.join(sorted(missing))}")
+
+    values = {}
+    for field in fields:
+        value = record.get(field)
+        try:
+            if value is None:
+                pass
+            elif field in _INT_FIELDS:
+                value = int(value)
+            elif field in _BOOL_FIELDS:
+                value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+            elif field == "budget":
+                value = float(value)
+                if value < 0:
+                    raise ValueError("budget cannot be negative")
+            elif field in ("start_date", "end_date"):
+                value = date.fromisoformat(value)
+            elif field in ("timestamp", "datetime"):
+                value = datetime.fromisoformat(value)
+            elif field == "status":
+                value = ProposalStatus[value]
+        except (ValueError, KeyError, TypeError) as e:
+            raise RecordError(f"{record_type}.{field}: invalid value {value!r} ({e})")
+        values[field] = value
+
+    if record_type == "proposal" and values["start_date"] and values["end_date"]:
+        if values["end_date"] < values["start_date"]:
+            raise RecordError("proposal: end_date is before start_date")
+    return record_type, values
+
+
+def import_records(records, batch_size: int = 1000, dry_run: bool = False, progress=None) -> dict:
+    """
+    Validate and insert records in batches of `batch_size` using executemany.
+
+    Referenced users and proposals must exist or be imported earlier in the
+    stream, and ids must not repeat. A batch the database rejects (e.g. an id
+    that is already taken) is rolled back and retried row by row, so only its
+    offending rows are rejected.
+
+    Returns a summary with inserted / rejected counts, errors (first 100) and rows per second.
+    """
+    known_users = set(db.session.execute(db.select(User.id)).scalars())
+    known_proposals = set(db.session.execute(db.select(TripProposal.id)).scalars())
+    seen_ids = {record_type: set() for record_type in RECORD_TYPES}
+    batches = {record_type: [] for record_type in RECORD_TYPES}   # [(line_no, values)]
+    counted = set()   # proposals whose message_count must be recomputed
+    summary = {"inserted": 0, "rejected": 0, "errors": []}
+    started = time.perf_counter()
+
+    def reject(line_no, error):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < 100:
+            summary["errors"].append(f"line {line_no}: {error}")
+
+    def inserted(record_type, values):
+        summary["inserted"] += 1
+        if record_type in ("proposal", "message"):
+            counted.add(values["id"] if record_type == "proposal" else values["proposal_id"])
+
+    def flush(record_type):
+        rows = batches[record_type]
+        if not rows:
+            return
+        batches[record_type] = []
+        table = RECORD_TYPES[record_type][0].__table__
+        if dry_run:
+            summary["inserted"] += len(rows)
+        else:
+            try:
+                db.session.execute(db.insert(table), [values for _, values in rows])  # executemany
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                # Find the offending rows; the others are still inserted
+                for line_no, values in rows:
+                    try:
+                        db.session.execute(db.insert(table), values)
+                        db.session.commit()
+                    except SQLAlchemyError as e:
+                        db.session.rollback()
+                        if record_type == "proposal":
+                            known_proposals.discard(values["id"])
+                        reject(line_no, f"{record_type}: {type(e).__name__}: {getattr(e, 'orig', e)}")
+                    else:
+                        inserted(record_type, values)
+            else:
+                for _, values in rows:
+                    inserted(record_type, values)
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(summary["inserted"], summary["inserted"] / elapsed if elapsed else 0.0)
+
+    for line_no, record in records:
+        try:
+            if isinstance(record, RecordError):
+                raise record
+            record_type, values = validate_record(record)
+            for user_field in ("user_id", "creator_id"):
+                if values.get(user_field) is not None and values[user_field] not in known_users:
+                    raise RecordError(f"{record_type}: unknown user {values[user_field]}")
+            if record_type == "proposal":
+                if values["id"] in known_proposals:
+                    raise RecordError(f"proposal: duplicate id {values['id']}")
+            else:
+                if values["proposal_id"] not in known_proposals:
+                    raise RecordError(f"{record_type}: unknown proposal {values['proposal_id']}")
+                if values["id"] in seen_ids[record_type]:
+                    raise RecordError(f"{record_type}: duplicate id {values['id']}")
+        except RecordError as e:
+            reject(line_no, e)
+            continue
+
+        if record_type == "proposal":
+            known_proposals.add(values["id"])
+        else:
+            seen_ids[record_type].add(values["id"])
+
+        # Proposals go first so rows referencing them never precede them in the database
+        if record_type != "proposal" and batches["proposal"]:
+            flush("proposal")
+        batches[record_type].append((line_no, values))
+        if len(batches[record_type]) >= batch_size:
+            flush(record_type)
+
+    for record_type in RECORD_TYPES:
+        flush(record_type)
+
+    if counted:
+        # Keep the incrementally maintained message counters of the affected proposals consistent
+        message_count = (
+            db.select(db.func.count(Message.id))
+            .where(Message.proposal_id == TripProposal.id)
+            .scalar_subquery()
+        )
+        ids = sorted(counted)
+        for i in range(0, len(ids), batch_size):
+            db.session.execute(
+                db.update(TripProposal)
+                .where(TripProposal.id.in_(ids[i:i + batch_size]))
+                .values(message_count=message_count)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = elapsed
+    summary["rows_per_second"] = summary["inserted"] / elapsed if elapsed else 0.0
+    return summary
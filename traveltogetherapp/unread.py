@@ -0,0 +1,66 @@
+"""
+Unread message counters based on per-participant read cursors.
+
+Each Participation stores the newest message id the user has seen. Unread
+counts for all of a user's trips come from one aggregate query that uses the
+(proposal_id, id) index on message. With UNREAD_USE_COUNTERS enabled, counts
+are instead taken from TripProposal.message_count - Participation.read_message_count,
+which never touches the message table (useful for very busy trips).
+"""
+from flask import current_app
+
+from .models import db, Participation, Message, TripProposal
+
+
+def unread_query(user_id: int, use_counters: bool = False):
+    """Query returning (proposal_id, unread count) rows for every trip the user is on."""
+    if use_counters:
+        query = (
+            db.select(
+                Participation.proposal_id,
+                TripProposal.message_count - Participation.read_message_count,
+            )
+            .join(TripProposal, TripProposal.id == Participation.proposal_id)
+            .where(Participation.user_id == user_id)
+        )
+    else:
+        query = (
+            db.select(Participation.proposal_id, db.func.count(Message.id))
+            .join(
+                Message,
+                db.and_(
+                    Message.proposal_id == Participation.proposal_id,
+                    Message.id > Participation.last_read_message_id,
+                ),
+            )
+            .where(Participation.user_id == user_id)
+            .group_by(Participation.proposal_id)
+        )
+    return query
+
+
+def unread_counts(user_id: int) -> dict[int, int]:
+    """Return {proposal_id: unread message count} for every trip the user is on."""
+    query = unread_query(user_id, current_app.config.get("UNREAD_USE_COUNTERS", False))
+    return {proposal_id: max(n, 0) for proposal_id, n in db.session.execute(query) if n}
+
+
+def advance_read_cursor(participation: Participation, messages: list[Message]) -> bool:
+    """
+    Move the read cursor to the newest of the given (complete) message list.
+    Returns True if the participation changed and needs to be committed.
+    """
+    if not messages:
+        return False
+    newest = max(m.id for m in messages)
+    if newest <= participation.last_read_message_id:
+        return False
+    participation.last_read_message_id = newest
+    participation.read_message_count = len(messages)
+    return True
+
+
+def mark_read(participation: Participation, messages: list[Message]) -> None:
+    """Advance the read cursor and commit."""
+    if advance_read_cursor(participation, messages):
+        db.session.commit()